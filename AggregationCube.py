@@ -0,0 +1,121 @@
+import os
+import json
+import pandas as pd
+from Path import DatasetPaths, CachePaths, ShapePaths
+from StreamAggregator import StreamAggregator
+
+class AggregationCube:
+    VERSION = 2
+    KEYS = ["SITE_ID", "STATE", "YEAR", "MONTH", "VARIABLE"]
+    STATS = ("sum", "count", "min", "max")
+
+    def __init__(self, loader, coor, shapefile_path=ShapePaths["USStates"], cache_dir=CachePaths["Parquet"]):
+        self.loader = loader
+        self.coor = coor
+        self.shapefile_path = shapefile_path
+        self.folder = os.path.join(cache_dir, "cube")
+        self.aggregator = StreamAggregator(loader)
+        self.cubes = {}
+        self.rollups = {}
+
+    def siteStates(self):
+        return self.loader.getStates(self.shapefile_path, self.coor)
+
+    def sourceKey(self, label):
+        key = {"version": self.VERSION, "sources": []}
+        for path in DatasetPaths.get(label, []):
+            stat = os.stat(path)
+            key["sources"].append([os.path.basename(path), stat.st_size, stat.st_mtime_ns])
+        # STATE comes from the shapefile, so a different or edited shapefile makes the cube stale too
+        stat = os.stat(self.shapefile_path)
+        key["shapefile"] = [os.path.abspath(self.shapefile_path), stat.st_size, stat.st_mtime_ns]
+        return key
+
+    def paths(self, label):
+        return (os.path.join(self.folder, f"{label.lower()}.parquet"),
+                os.path.join(self.folder, f"{label.lower()}.json"))
+
+    def isFresh(self, label):
+        data_path, meta_path = self.paths(label)
+        if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+            return False
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f) == self.sourceKey(label)
+        except (OSError, ValueError):
+            return False
+
+    def forget(self, label):
+        self.rollups = {key: df for key, df in self.rollups.items() if key[0] != label}
+
+    def save(self, label):
+        self.forget(label)
+        os.makedirs(self.folder, exist_ok=True)
+        data_path, meta_path = self.paths(label)
+        self.cubes[label].to_parquet(data_path, index=False)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(self.sourceKey(label), f)
+        print(f"💾 Saved cube: {data_path}")
+
+    def build(self, labels=None):
+        states = None
+        for label in labels or self.loader.get_labels():
+            if self.isFresh(label):
+                self.cubes[label] = pd.read_parquet(self.paths(label)[0])
+                self.forget(label)
+                print(f"⚡ Loaded cube: {label} ({len(self.cubes[label]):,} cells)")
+                continue
+
+            if states is None:
+                states = self.siteStates()
+            # Keep rows with missing keys so coarser rollups still count them
+            partial = self.aggregator.sumCount(
+                label, ["SITE_ID", "YEAR", "MONTH", "VARIABLE"],
+                columns=["SITE_ID", "YEAR", "MONTH", "VARIABLE", "CONC"],
+                stats=self.STATS, dropna=False).reset_index()
+            partial["STATE"] = partial["SITE_ID"].astype(str).map(states)
+            self.cubes[label] = partial[self.KEYS + list(self.STATS)]
+            print(f"🧊 Built cube: {label} ({len(self.cubes[label]):,} cells)")
+            self.save(label)
+
+    def loadSaved(self, label):
+        # Loads the last saved cube even if its source files have changed since
+        data_path = self.paths(label)[0]
+        if label not in self.cubes and os.path.exists(data_path):
+            self.cubes[label] = pd.read_parquet(data_path)
+        return label in self.cubes
+
+    def applyRows(self, label, df, value="CONC"):
+        # Folds appended rows into the saved cube and returns just the cells they touched
+        chunk = df.copy()
+        chunk[value] = pd.to_numeric(chunk[value], errors="coerce")
+        keys = ["SITE_ID", "YEAR", "MONTH", "VARIABLE"]
+        delta = chunk.groupby(keys, observed=True, dropna=False)[value].agg(list(self.STATS)).reset_index()
+        delta["STATE"] = delta["SITE_ID"].astype(str).map(self.siteStates())
+        delta = delta[self.KEYS + list(self.STATS)].astype({"SITE_ID": str})
+
+        if self.loadSaved(label):
+            cube = pd.concat([self.cubes[label].astype({"SITE_ID": str}), delta], ignore_index=True)
+            merged = cube.groupby(self.KEYS, observed=True, dropna=False).agg(StreamAggregator.MERGE)
+            self.cubes[label] = merged.reset_index()[self.KEYS + list(self.STATS)]
+        else:
+            self.cubes[label] = delta
+        print(f"🧊 Updated cube: {label} (+{len(delta):,} cells)")
+        self.save(label)
+        return delta
+
+    def rollup(self, label, keys, value="CONC"):
+        if label not in self.cubes:
+            raise ValueError(f"❌ Cube has no data for label: '{label}'")
+        memo_key = (label, tuple(keys), value)
+        if memo_key not in self.rollups:
+            self.rollups[memo_key] = self.aggregate(label, keys, value)
+        # Callers add/convert columns in place, so hand out a copy of the memoized rollup
+        return self.rollups[memo_key].copy()
+
+    def aggregate(self, label, keys, value="CONC"):
+        grouped = self.cubes[label].groupby(keys, observed=True).agg(
+            sum=("sum", "sum"), count=("count", "sum"), min=("min", "min"), max=("max", "max"))
+        # Same result as DataFrame.groupby(keys)[value].mean() over the raw rows
+        grouped[value] = grouped["sum"] / grouped["count"].where(grouped["count"] > 0)
+        return grouped.reset_index()
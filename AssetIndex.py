@@ -0,0 +1,116 @@
+import os
+import json
+
+class AssetIndex:
+    VERSION = 2
+    FILENAME = "asset_index.json"
+    FIELDS = ["network", "kind", "state", "year", "chemical", "path"]
+    KEY = FIELDS[:-1]
+
+    def __init__(self, folder_name="assets", entries=None):
+        self.folder = folder_name
+        self.path = os.path.join(folder_name, self.FILENAME)
+        # path (relative to the assets folder) -> entry
+        self.entries = {entry["path"]: entry for entry in entries or []}
+        self.updates = {}
+        self.lookup = None
+        self.size = 0
+
+    @classmethod
+    def load(cls, folder_name="assets"):
+        # One JSON read at startup; without an index, fall back to a single walk over the folder
+        path = os.path.join(folder_name, cls.FILENAME)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == cls.VERSION:
+                return cls(folder_name, data["entries"])
+        except (OSError, ValueError, KeyError):
+            pass
+        return cls.scan(folder_name)
+
+    @classmethod
+    def scan(cls, folder_name="assets"):
+        index = cls(folder_name)
+        for root, _, files in os.walk(folder_name):
+            for filename in files:
+                entry = cls.parse(filename)
+                if entry is not None:
+                    rel = os.path.relpath(os.path.join(root, filename), folder_name).replace(os.sep, "/")
+                    index.entries[rel] = {**entry, "path": rel, "source": "scan"}
+        return index
+
+    @classmethod
+    def key(cls, entry):
+        return tuple(entry[field] for field in cls.KEY)
+
+    @staticmethod
+    def parse(filename):
+        if not filename.endswith(".html"):
+            return None
+        network, _, rest = filename[:-len(".html")].partition("_")
+        parts = rest.split("_")
+        if rest == "Yearly_chart":
+            return {"network": network, "kind": "Yearly", "state": "ALL", "year": None, "chemical": None}
+        if len(parts) == 3 and parts[1:] == ["Yearly", "chart"]:
+            return {"network": network, "kind": "Yearly", "state": parts[0], "year": None, "chemical": None}
+        if len(parts) == 2 and parts[1] == "Monthly" and parts[0].isdigit():
+            return {"network": network, "kind": "Monthly", "state": "ALL", "year": parts[0], "chemical": None}
+        if len(parts) == 4 and parts[2:] == ["Monthly", "chart"] and parts[1].isdigit():
+            return {"network": network, "kind": "Monthly", "state": parts[0], "year": parts[1], "chemical": None}
+        if rest.endswith("_map"):
+            return {"network": network, "kind": "Map", "state": None, "year": None, "chemical": rest[:-len("_map")]}
+        return None
+
+    def add(self, path, network, kind, state=None, year=None, chemical=None):
+        rel = os.path.relpath(path, self.folder).replace(os.sep, "/")
+        entry = {"network": network, "kind": kind, "state": state,
+                 "year": None if year is None else str(year), "chemical": chemical, "path": rel, "source": "build"}
+        self.entries[rel] = entry
+        self.updates[rel] = entry
+
+    def save(self):
+        if not self.updates:
+            return
+        # Merge with what is on disk so each generator only contributes its own entries. Entries recorded by a
+        # generator are authoritative: a scanned (legacy) file or an older output for the same key is dropped.
+        written = {self.key(entry): path for path, entry in self.updates.items()}
+        entries = {}
+        for path, entry in AssetIndex.load(self.folder).entries.items():
+            if written.get(self.key(entry), path) == path:
+                entries[path] = entry
+        entries.update(self.updates)
+        built = {self.key(entry) for entry in entries.values() if entry.get("source") == "build"}
+        entries = {path: entry for path, entry in entries.items()
+                   if entry.get("source") == "build" or self.key(entry) not in built}
+        os.makedirs(self.folder, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, "entries": sorted(entries.values(), key=lambda e: e["path"])}, f)
+        self.entries = entries
+        self.updates = {}
+        self.lookup = None
+
+    def values(self, field, **match):
+        return sorted({entry[field] for entry in self.entries.values()
+                       if entry[field] is not None and all(entry[k] == v for k, v in match.items())})
+
+    def rank(self, entry):
+        # Generator-recorded entries beat scanned ones; among equals the newer file wins
+        try:
+            mtime = os.path.getmtime(os.path.join(self.folder, entry["path"]))
+        except OSError:
+            mtime = -1
+        return entry.get("source") == "build", mtime
+
+    def find(self, network, kind, state=None, year=None, chemical=None):
+        if self.lookup is None or self.size != len(self.entries):
+            self.lookup = {}
+            for entry in self.entries.values():
+                key = self.key(entry)
+                if key not in self.lookup:
+                    self.lookup[key] = entry
+                elif self.rank(entry) > self.rank(self.lookup[key]):
+                    self.lookup[key] = entry
+            self.size = len(self.entries)
+        entry = self.lookup.get((network, kind, state, None if year is None else str(year), chemical))
+        return None if entry is None else entry["path"]
@@ -0,0 +1,79 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+class BuildManifest:
+    VERSION = 1
+
+    def __init__(self, folder_name="assets", force=False):
+        # force=True rewrites every output but still records fresh hashes
+        self.folder = folder_name
+        self.path = os.path.join(folder_name, ".build_manifest.json")
+        self.force = force
+        self.entries = self.read()
+        self.updates = {}
+        self.skipped = 0
+
+    def read(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def feed(self, h, obj):
+        if isinstance(obj, pd.DataFrame):
+            h.update(repr(list(obj.columns)).encode())
+            h.update(pd.util.hash_pandas_object(obj, index=False).to_numpy().tobytes())
+        elif isinstance(obj, pd.Series):
+            self.feed(h, obj.to_frame())
+        elif isinstance(obj, np.ndarray):
+            h.update(str(obj.dtype).encode())
+            h.update(obj.tobytes() if obj.dtype != object else repr(obj.tolist()).encode())
+        elif isinstance(obj, dict):
+            for key in sorted(obj, key=str):
+                h.update(repr(key).encode())
+                self.feed(h, obj[key])
+        elif isinstance(obj, (list, tuple)):
+            h.update(f"[{len(obj)}".encode())
+            for item in obj:
+                self.feed(h, item)
+        else:
+            h.update(repr(obj).encode())
+
+    def digest(self, *inputs):
+        h = hashlib.sha256(str(self.VERSION).encode())
+        for obj in inputs:
+            self.feed(h, obj)
+        return h.hexdigest()
+
+    def key(self, path):
+        return os.path.relpath(path, self.folder).replace(os.sep, "/")
+
+    def isCurrent(self, path, digest):
+        # Like make: skip only when the output exists and was built from the same inputs
+        current = not self.force and os.path.exists(path) and self.entries.get(self.key(path)) == digest
+        self.skipped += current
+        return current
+
+    def record(self, path, digest):
+        self.entries[self.key(path)] = digest
+        self.updates[self.key(path)] = digest
+
+    def save(self):
+        if self.skipped:
+            print(f"⏭️ Skipped {self.skipped:,} unchanged file(s)")
+            self.skipped = 0
+        if not self.updates:
+            return
+        # Re-read so plotters sharing the folder don't drop each other's entries
+        entries = {**self.read(), **self.updates}
+        os.makedirs(self.folder, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=0, sort_keys=True)
+        self.entries = entries
+        self.updates = {}
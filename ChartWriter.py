@@ -0,0 +1,45 @@
+import os
+from FigureRenderer import lineFigure
+from BuildManifest import BuildManifest
+from AssetIndex import AssetIndex
+from CompactFigure import writeFigure
+
+class ChartWriter:
+    def __init__(self, renderer=None, manifest=None, index=None, compact=False):
+        # renderer is a FigureRenderer (process pool); None writes each file inline
+        self.renderer = renderer
+        self.manifest = manifest or BuildManifest()
+        self.index = index or AssetIndex()
+        self.compact = compact
+
+    def stale(self, path, label, digest, **entry):
+        # Every output written or kept is indexed for the dashboard
+        self.index.add(path, label, **entry)
+        return not self.manifest.isCurrent(path, digest)
+
+    def save(self, fig, path, digest, folder_name="assets"):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        writeFigure(fig, path, self.compact, folder_name)
+        self.manifest.record(path, digest)
+        print(f"✅ Saved HTML: {path}")
+
+    def write(self, label, filename, payload, entry, sink=None, folder_name="assets"):
+        # With a sink (on-demand dashboard) payloads are collected by filename instead of written
+        if sink is not None:
+            sink[filename] = payload
+            return
+        path = os.path.join(folder_name, label.lower(), filename)
+        digest = self.manifest.digest(payload, self.compact)
+        if not self.stale(path, label, digest, **entry):
+            return
+        if self.renderer is None:
+            self.save(lineFigure(payload), path, digest, folder_name)
+        else:
+            self.renderer.submit(lineFigure, payload, path, self.compact, folder_name)
+            self.manifest.record(path, digest)
+
+    def finish(self):
+        if self.renderer is not None:
+            self.renderer.run()
+        self.manifest.save()
+        self.index.save()
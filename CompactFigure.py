@@ -0,0 +1,136 @@
+import os
+import json
+import base64
+import html
+import numpy as np
+import plotly.io as pio
+from plotly.offline import get_plotlyjs
+from plotly.utils import PlotlyJSONEncoder
+from StaticAssets import precompress
+
+# Shared files live in their own subfolder: Dash injects every .js under assets/ into the dashboard page,
+# so the dashboard excludes these with ASSETS_IGNORE
+SHARED = "compact"
+BUNDLE = f"{SHARED}/plotly.min.js"
+LOADER = f"{SHARED}/figure-loader.js"
+TEMPLATES = f"{SHARED}/templates"
+ASSETS_IGNORE = r"^(plotly\.min|figure-loader)\.js$"
+
+LOADER_JS = """async function renderFigure(src, root) {
+  const fig = await (await fetch(src)).json();
+  if (fig.layout && typeof fig.layout.template === "string") {
+    fig.layout.template = await (await fetch(root + "%s/" + fig.layout.template + ".json")).json();
+  }
+  fig.config = Object.assign({responsive: true}, fig.config);
+  await Plotly.newPlot("figure", fig);
+}
+""" % TEMPLATES
+
+STUB_HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<script src="{root}{bundle}"></script><script src="{root}{loader}"></script></head>
+<body style="margin:0"><div id="figure" style="width:100%;height:100vh"></div>
+<script>renderFigure("{src}", "{root}");</script></body></html>
+"""
+
+# Shared files this process has already written or found current, so later figures skip them
+written = set()
+
+def writeShared(folder_name, name, text):
+    # Written once per assets folder and rewritten only when the content changes (e.g. plotly upgrade)
+    path = os.path.join(folder_name, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = text.encode("utf-8")
+    if os.path.exists(path) and os.path.getsize(path) == len(data):
+        with open(path, "rb") as f:
+            if f.read() == data:
+                written.add(os.path.abspath(path))
+                return
+    # Render workers may race here; replace atomically so no reader sees a half-written bundle
+    partial = f"{path}.{os.getpid()}.tmp"
+    with open(partial, "wb") as f:
+        f.write(data)
+    os.replace(partial, path)
+    precompress(path)
+    written.add(os.path.abspath(path))
+
+def isWritten(folder_name, name):
+    path = os.path.join(folder_name, name)
+    return os.path.abspath(path) in written and os.path.exists(path)
+
+def ensureShared(folder_name="assets"):
+    if not isWritten(folder_name, BUNDLE):
+        writeShared(folder_name, BUNDLE, get_plotlyjs())
+    if not isWritten(folder_name, LOADER):
+        writeShared(folder_name, LOADER, LOADER_JS)
+
+def slimArray(values, decimals):
+    values = np.asarray(values)
+    if values.dtype.kind == "f":
+        values = np.round(values.astype("float64"), decimals).astype("float32")
+        return {"dtype": "f4", "bdata": base64.b64encode(values.tobytes()).decode("ascii"),
+                **({"shape": ",".join(map(str, values.shape))} if values.ndim > 1 else {})}
+    if values.dtype.kind in "iu":
+        for dtype, code in [("int8", "i1"), ("int16", "i2"), ("int32", "i4")]:
+            if values.size == 0 or (values.min() >= np.iinfo(dtype).min and values.max() <= np.iinfo(dtype).max):
+                values = values.astype(dtype)
+                return {"dtype": code, "bdata": base64.b64encode(values.tobytes()).decode("ascii"),
+                        **({"shape": ",".join(map(str, values.shape))} if values.ndim > 1 else {})}
+    return values.tolist()
+
+def slim(obj, decimals):
+    # Data arrays become rounded float32 (or narrow int) typed arrays; plotly.js decodes {dtype, bdata}
+    if isinstance(obj, np.ndarray):
+        return slimArray(obj, decimals)
+    if isinstance(obj, dict):
+        if "bdata" in obj and "dtype" in obj:
+            values = np.frombuffer(base64.b64decode(obj["bdata"]), dtype=np.dtype(obj["dtype"]))
+            if "shape" in obj:
+                values = values.reshape([int(n) for n in str(obj["shape"]).split(",")])
+            return slimArray(values, decimals)
+        return {key: slim(value, decimals) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        # Plain lists are left as lists: layout attributes like range/domain don't accept typed arrays
+        return [slim(value, decimals) for value in obj]
+    if isinstance(obj, float):
+        return round(obj, decimals)
+    return obj
+
+def templateName(fig):
+    names = ("plotly_white", "plotly_dark", "plotly", "simple_white", "ggplot2", "seaborn", "presentation")
+    for name in sorted(names, key=lambda name: name != pio.templates.default):
+        if fig.layout.template == pio.templates[name]:
+            return name
+    return None
+
+def writeCompact(fig, path, folder_name="assets", decimals=4):
+    # path is the .html the dashboard links to; it becomes a small stub that renders the sibling .json
+    ensureShared(folder_name)
+    spec = fig.to_plotly_json()
+    template = templateName(fig)
+    if template is not None:
+        # The expanded template is identical in every figure, so it is stored once per assets folder
+        name = os.path.join(TEMPLATES, f"{template}.json")
+        if not isWritten(folder_name, name):
+            writeShared(folder_name, name,
+                        json.dumps(spec["layout"]["template"], cls=PlotlyJSONEncoder, separators=(",", ":")))
+        spec["layout"]["template"] = template
+    spec = slim(spec, decimals)
+
+    json_path = os.path.splitext(path)[0] + ".json"
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(spec, f, cls=PlotlyJSONEncoder, separators=(",", ":"))
+    root = os.path.relpath(folder_name, os.path.dirname(path)).replace(os.sep, "/") + "/"
+    title = fig.layout.title.text or ""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(STUB_HTML.format(title=html.escape(title.split("<br>")[0]), root="" if root == "./" else root,
+                                 bundle=BUNDLE, loader=LOADER, src=os.path.basename(json_path)))
+    precompress(json_path)
+    precompress(path)
+
+def writeFigure(fig, path, compact=False, folder_name="assets", include_plotlyjs='cdn'):
+    if compact:
+        writeCompact(fig, path, folder_name)
+        return
+    fig.write_html(path, include_plotlyjs=include_plotlyjs)
+    precompress(path)
@@ -3,22 +3,47 @@ from dash import dcc, html, Input, Output
 import os
 import sys 
 import flask
+from AssetIndex import AssetIndex
+from StaticAssets import sendAsset
+from CompactFigure import ASSETS_IGNORE
 
 class ChemicalDashboardApp:
    
-    def __init__(self):
+    def __init__(self, store=None, prewarm=False, asset_max_age=300):
         self.assets_folder = self.get_assets_path() 
-        self.states = self.get_states()
-        self.years = self.get_years()
-        self.chemicals = self.get_chemicals()
-        self.app = dash.Dash(__name__, assets_folder=self.assets_folder)
+        # With a FigureStore, charts are built on demand into dcc.Graph instead of loading assets/ iframes
+        self.store = store
+        # One read of assets/asset_index.json (or one folder walk if it is missing) backs every lookup
+        self.index = AssetIndex.load(self.assets_folder) if store is None else None
+        source = store if store is not None else self
+        self.states = source.get_states()
+        self.years = source.get_years()
+        self.chemicals = source.get_chemicals()
+        if store is not None and prewarm:
+            store.prewarm()
+        # The compact charts' plotly bundle and loader are for the iframes, not the dashboard page
+        self.app = dash.Dash(__name__, assets_folder=self.assets_folder, assets_ignore=ASSETS_IGNORE)
         self.app.title = "Chemical Exposure Dashboard"
         self.layout()
         self.setup_callbacks()
 
-        @self.app.server.route('/assets/<path:filename>')
+        # Serves the precompressed .br/.gz variant the browser accepts, with ETag and Cache-Control
         def serve_static(filename):
-            return flask.send_from_directory(self.assets_folder, filename)
+            return sendAsset(self.assets_folder, filename, max_age=asset_max_age)
+
+        # Dash registers its own /assets/ rule first, which would otherwise shadow this one
+        server = self.app.server
+        endpoint = next((rule.endpoint for rule in server.url_map.iter_rules()
+                         if rule.rule == '/assets/<path:filename>'), None)
+        if endpoint is not None:
+            server.view_functions[endpoint] = serve_static
+        else:
+            server.add_url_rule('/assets/<path:filename>', 'serve_static', serve_static)
+
+        if self.store is not None:
+            @self.app.server.route('/debug/figure-cache')
+            def figure_cache_stats():
+                return flask.jsonify(self.store.cache.stats())
 
     def get_assets_path(self):
         if getattr(sys, 'frozen', False):
@@ -26,35 +51,22 @@ class ChemicalDashboardApp:
         return os.path.join(os.path.dirname(__file__), 'assets')
 
     def get_states(self):
-        states = set()
-        for filename in os.listdir(self.assets_folder):
-            if not filename.endswith(".html"):
-                continue
-            if "Yearly_chart" in filename or "Monthly_chart" in filename:
-                parts = filename.replace(".html", "").split("_")
-                if len(parts) == 3:  # castnet_Yearly_chart.html
-                    states.add("ALL")
-                elif len(parts) >= 3:
-                    states.add(parts[1])
-        return sorted(states)
+        return self.index.values("state")
 
     def get_years(self):
-        years = set()
-        for filename in os.listdir(self.assets_folder):
-            if "Monthly" in filename and filename.endswith(".html"):
-                parts = filename.replace(".html", "").split("_")
-                if len(parts) >= 3 and parts[2].isdigit():
-                    years.add(parts[2])
-        return sorted(years)
+        return self.index.values("year")
 
     def get_chemicals(self):
-        chemicals = set()
-        for filename in os.listdir(self.assets_folder):
-            if filename.endswith("_map.html"):
-                parts = filename.replace(".html", "").split("_")
-                if len(parts) == 3:
-                    chemicals.add(parts[1])
-        return sorted(chemicals)
+        return self.index.values("chemical")
+
+    def asset_url(self, network, kind, state=None, year=None, chemical=None):
+        path = self.index.find(network, kind, state, year, chemical)
+        return f"/assets/{path}" if path else "about:blank"
+
+    def chartView(self, name, style):
+        if self.store is not None:
+            return dcc.Graph(id=f'{name}-frame', style=style)
+        return html.Iframe(id=f'{name}-frame', style=style)
 
     def layout(self):
         self.app.layout = html.Div([
@@ -147,7 +159,7 @@ class ChemicalDashboardApp:
                             id="loading-castnet",
                             type="circle",
                             color="#3b7ddd",
-                            children=html.Iframe(id='castnet-frame', 
+                            children=self.chartView('castnet', 
                                                 style={'width': '100%', 'height': '700px'})
                         ),
                         
@@ -170,7 +182,7 @@ class ChemicalDashboardApp:
                             id="loading-nadp",
                             type="circle",
                             color="#3b7ddd",
-                            children=html.Iframe(id='nadp-frame', 
+                            children=self.chartView('nadp', 
                                                     style={'width': '100%', 'height': '700px'})
                         ),
                     ], style={'padding': '10px'})
@@ -215,7 +227,7 @@ class ChemicalDashboardApp:
                         'maxWidth': '300px',
                         'margin': 'auto',
                         'marginBottom': '20px'}),
-                        html.Iframe(id='map-castnet-frame', style={'width': '100%', 'height': '700px'}),
+                        self.chartView('map-castnet', style={'width': '100%', 'height': '700px'}),
                         
                         html.Div([
                         html.H3("NADP Map", style={'margin': '0',
@@ -230,7 +242,7 @@ class ChemicalDashboardApp:
                             'margin': 'auto',
                             'marginTop': '30px',
                             'marginBottom': '20px',}),
-                        html.Iframe(id='map-nadp-frame', style={'width': '100%', 'height': '700px'})
+                        self.chartView('map-nadp', style={'width': '100%', 'height': '700px'})
                     ], style={'padding': '10px'})
                 ]),
 
@@ -297,6 +309,8 @@ class ChemicalDashboardApp:
         }),
 
     def setup_callbacks(self):
+        prop = 'src' if self.store is None else 'figure'
+
         @self.app.callback(
             Output('year-dropdown-div', 'style'),
             Input('freq-selector', 'value')
@@ -305,50 +319,37 @@ class ChemicalDashboardApp:
             return {'display': 'block'} if freq == 'Monthly' else {'display': 'none'}
 
         @self.app.callback(
-            Output('castnet-frame', 'src'),
-            Output('nadp-frame', 'src'),
+            Output('castnet-frame', prop),
+            Output('nadp-frame', prop),
             Input('freq-selector', 'value'),
             Input('state-selector', 'value'),
             Input('year-selector', 'value'),
         )
         def update_line_iframes(freq, state, year):
-            if freq == 'Yearly':
-                if state == 'ALL':
-                    return (
-                        "/assets/castnet_Yearly_chart.html",
-                        "/assets/nadp_Yearly_chart.html"
-                    )
-                else:
-                    return (
-                        f"/assets/castnet_{state}_Yearly_chart.html",
-                        f"/assets/nadp_{state}_Yearly_chart.html"
-                    )
-            else:
-                if not year:
-                    return dash.no_update, dash.no_update
-                if state == 'ALL':
-                    return (
-                        f"/assets/castnet_{year}_Monthly.html",
-                        f"/assets/nadp_{year}_Monthly.html"
-                    )
-                else:
-                    return (
-                        f"/assets/castnet_{state}_{year}_Monthly_chart.html",
-                        f"/assets/nadp_{state}_{year}_Monthly_chart.html"
-                    )
+            # Only selections offered by the dropdowns are served
+            if state != 'ALL' and state not in self.states:
+                return dash.no_update, dash.no_update
+            if freq == 'Monthly' and year not in self.years:
+                return dash.no_update, dash.no_update
+            year = year if freq == 'Monthly' else None
+            if self.store is not None:
+                return (self.store.chartFigure('castnet', freq, state, year),
+                        self.store.chartFigure('nadp', freq, state, year))
+            return (self.asset_url('castnet', freq, state, year),
+                    self.asset_url('nadp', freq, state, year))
 
         @self.app.callback(
-            Output('map-castnet-frame', 'src'),
-            Output('map-nadp-frame', 'src'),
+            Output('map-castnet-frame', prop),
+            Output('map-nadp-frame', prop),
             Input('map-chemical-selector', 'value')
         )
         def update_maps(chemical):
-            if not chemical:
+            if chemical not in self.chemicals:
                 return dash.no_update, dash.no_update
-            return (
-                f"/assets/castnet_{chemical}_map.html",
-                f"/assets/nadp_{chemical}_map.html"
-            )
+            if self.store is not None:
+                return self.store.mapFigure('castnet', chemical), self.store.mapFigure('nadp', chemical)
+            return (self.asset_url('castnet', 'Map', chemical=chemical),
+                    self.asset_url('nadp', 'Map', chemical=chemical))
 
     def run(self, debug=False, port=8050):
         import webbrowser
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+class DateParser:
+    # CASTNET writes ISO timestamps, NADP writes month/day/year with minutes
+    FORMATS = ["%Y-%m-%d %H:%M:%S", "%m/%d/%Y %H:%M"]
+    DATE_COLS = ["DATEON", "DATEOFF"]
+    # Calendar parts of DATEON, stored as small nullable ints (NA where DATEON didn't parse)
+    PARTS = {"YEAR": "Int16", "MONTH": "Int8", "WEEK": "Int8"}
+
+    def __init__(self):
+        # Weekly files repeat the same few thousand timestamps across millions of rows and chunks
+        self.memo = {}
+
+    def parseStrings(self, values):
+        values = pd.Index(values, dtype=object)
+        result = pd.Series(pd.NaT, index=range(len(values)), dtype="datetime64[us]")
+        todo = np.ones(len(values), dtype=bool)
+        for fmt in self.FORMATS:
+            if not todo.any():
+                break
+            parsed = pd.to_datetime(values[todo], format=fmt, errors="coerce")
+            result[todo] = parsed
+            todo[todo] = parsed.isna()
+        if todo.any():
+            # Anything outside the known formats (hand-edited rows) still gets per-string inference
+            result[todo] = pd.to_datetime(values[todo], format="mixed", errors="coerce")
+        return result
+
+    def parse(self, series):
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return series
+        codes, uniques = pd.factorize(series)
+        uniques = [str(value) for value in uniques]
+        new = [value for value in uniques if value not in self.memo]
+        if new:
+            self.memo.update(zip(new, self.parseStrings(new)))
+        parsed = pd.DatetimeIndex([self.memo[value] for value in uniques], dtype="datetime64[us]")
+        return pd.Series(parsed.take(codes, allow_fill=True, fill_value=pd.NaT), index=series.index, name=series.name)
+
+    def prepare(self, df):
+        for col in self.DATE_COLS:
+            if col in df.columns:
+                df[col] = self.parse(df[col])
+        if "DATEON" in df.columns:
+            dateon = df["DATEON"].dt
+            parts = {"YEAR": dateon.year, "MONTH": dateon.month, "WEEK": dateon.isocalendar().week}
+            for col, dtype in self.PARTS.items():
+                # A YEAR column shipped with the source file is kept as-is
+                if col not in df.columns:
+                    df[col] = parts[col].astype(dtype)
+        return df
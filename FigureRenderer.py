@@ -0,0 +1,60 @@
+import os
+import time
+import plotly.graph_objects as go
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from CompactFigure import writeFigure
+
+def lineFigure(payload):
+    # payload: {"traces": [go.Scatter kwargs, ...], "layout": go.Layout kwargs}
+    fig = go.Figure()
+    for trace in payload["traces"]:
+        fig.add_trace(go.Scatter(**trace))
+    fig.update_layout(**payload["layout"])
+    return fig
+
+def renderFile(builder, payload, path, compact=False, folder_name="assets"):
+    began = time.perf_counter()
+    writeFigure(builder(payload), path, compact, folder_name)
+    return path, time.perf_counter() - began
+
+class FigureRenderer:
+    def __init__(self, workers=None, progress_every=100):
+        self.workers = workers or os.cpu_count()
+        self.progress_every = progress_every
+        self.jobs = []
+        self.report = []
+
+    def submit(self, builder, payload, path, compact=False, folder_name="assets"):
+        # builder must be a module-level function so worker processes can unpickle it
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.jobs.append((builder, payload, path, compact, folder_name))
+
+    def run(self):
+        jobs, self.jobs = self.jobs, []
+        if not jobs:
+            return None
+        print(f"🖨️ Rendering {len(jobs):,} HTML file(s) with {self.workers} workers")
+        busy = 0.0
+        began = time.perf_counter()
+        if self.workers > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = [pool.submit(renderFile, *job) for job in jobs]
+                for done, future in enumerate(as_completed(futures), 1):
+                    busy += future.result()[1]
+                    self.progress(done, len(jobs), began)
+        else:
+            for done, job in enumerate(jobs, 1):
+                busy += renderFile(*job)[1]
+                self.progress(done, len(jobs), began)
+
+        wall = time.perf_counter() - began
+        row = {"FILES": len(jobs), "WORKERS": self.workers, "CPU_SECONDS": round(busy, 2),
+               "SECONDS": round(wall, 2), "FILES_PER_S": round(len(jobs) / wall, 1) if wall else None}
+        self.report.append(row)
+        print(f"✅ Rendered {row['FILES']:,} file(s) in {row['SECONDS']}s "
+              f"({row['FILES_PER_S']} files/s, {row['CPU_SECONDS']} CPU s)")
+        return row
+
+    def progress(self, done, total, began):
+        if done % self.progress_every == 0 or done == total:
+            print(f"  ⏳ {done:,}/{total:,} files ({time.perf_counter() - began:.1f}s)")
@@ -0,0 +1,123 @@
+import copy
+import threading
+import plotly.graph_objects as go
+from collections import OrderedDict
+from LineGraphAllMap import ChartPlotterAllMap
+from LineGraphByState import ChartPlotterByState
+from GeographicChart import ChemicalMapVisualizer
+from FigureRenderer import lineFigure
+
+class FigureCache:
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Dash serves callbacks from several threads
+        self.lock = threading.Lock()
+
+    def get(self, key, build):
+        with self.lock:
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return self.entries[key]
+            self.misses += 1
+        figure = build()
+        if figure is None:
+            # Nothing found is not cached, so a later build can still fill the slot
+            return None
+        with self.lock:
+            self.entries[key] = figure
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return figure
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"size": len(self.entries), "maxsize": self.maxsize, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions,
+                    "hit_rate": round(self.hits / lookups, 3) if lookups else None}
+
+class FigureStore:
+    LABELS = ['castnet', 'nadp']
+
+    def __init__(self, loader, coor, cube, cache_size=256):
+        # The cube is the in-memory aggregate store; figures are cut from its rollups on request
+        self.cube = cube
+        self.cube.build(self.LABELS)
+        self.all_map = ChartPlotterAllMap(loader, cube=cube)
+        self.by_state = ChartPlotterByState(loader, coor, cube=cube)
+        self.geo = ChemicalMapVisualizer(loader, coor, cube=cube)
+        # Keyed by (freq, state, year, chemical, label); least recently used figures are evicted first
+        self.cache = FigureCache(cache_size)
+
+    def values(self, key):
+        found = set()
+        for label in self.LABELS:
+            found |= set(self.cube.cubes[label][key].dropna().astype(str))
+        return found
+
+    def get_states(self):
+        return ["ALL"] + sorted(self.values("STATE"))
+
+    def get_years(self):
+        return sorted(str(int(float(year))) for year in self.values("YEAR"))
+
+    def get_chemicals(self):
+        return sorted(self.values("VARIABLE"))
+
+    def collect(self, plotter, draw, scope):
+        # Runs the plotter's own draw method for a one-figure scope and keeps what it would have written.
+        # Dash runs callbacks in threads, so each build gets its own shallow copy with a private sink;
+        # the shared plotter is never touched.
+        local = copy.copy(plotter)
+        local.sink = {}
+        getattr(local, draw)(scope)
+        return list(local.sink.values())
+
+    def emptyFigure(self, message):
+        fig = go.Figure()
+        fig.update_layout(template='plotly_white', height=650, xaxis_visible=False, yaxis_visible=False,
+                          annotations=[dict(text=message, showarrow=False, font=dict(size=18))])
+        return fig
+
+    def build(self, freq, state, year, chemical, label):
+        if freq == 'Yearly' and state == 'ALL':
+            found = self.collect(self.all_map, "drawAllYearly", [label])
+        elif freq == 'Yearly':
+            found = self.collect(self.by_state, "drawYearlyByState", {label: {state}})
+        elif freq == 'Monthly' and state == 'ALL':
+            found = self.collect(self.all_map, "drawAllMonthly", {label: {int(year)}})
+        elif freq == 'Monthly':
+            found = self.collect(self.by_state, "drawMonthlyByState", {label: {(state, int(year))}})
+        else:
+            found = self.collect(self.geo, "drawGeoChart", {label: {chemical}})
+            return found[0] if found else None
+        return lineFigure(found[0]) if found else None
+
+    def figure(self, freq, state=None, year=None, chemical=None, label=None):
+        key = (freq, state, None if year is None else str(year), chemical, label)
+        figure = self.cache.get(key, lambda: self.build(*key))
+        if figure is None:
+            what = chemical if freq == 'Map' else "this selection"
+            return self.emptyFigure(f"No {label.upper()} data for {what}")
+        return figure
+
+    def chartFigure(self, label, freq, state, year=None):
+        return self.figure(freq, state, year if freq == 'Monthly' else None, label=label)
+
+    def mapFigure(self, label, chemical):
+        return self.figure('Map', chemical=chemical, label=label)
+
+    def prewarm(self):
+        # The landing selections: ALL/Yearly for each network and every chemical's map
+        for label in self.LABELS:
+            self.chartFigure(label, 'Yearly', 'ALL')
+            for chemical in self.get_chemicals():
+                self.mapFigure(label, chemical)
+        print(f"🔥 Pre-warmed figure cache: {self.cache.stats()['size']} figure(s)")
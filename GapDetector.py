@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+class GapDetector:
+    def __init__(self, freq_days=7):
+        self.step = np.int64(freq_days) * 86_400 * 10 ** 9
+
+    def toNanos(self, series):
+        return series.to_numpy(dtype="datetime64[ns]").astype("int64")
+
+    def detect(self, df):
+        df = df[df["SITE_ID"].notna()]
+        codes, sites = pd.factorize(df["SITE_ID"], sort=True)
+        sites = pd.Index(np.asarray(sites))
+        # DATEON/DATEOFF arrive parsed from the loader
+        dateon = df["DATEON"]
+        dateoff = df["DATEOFF"]
+
+        bounds = pd.DataFrame({"START": dateon.values, "END": dateoff.values}).groupby(codes).agg(
+            START=("START", "min"), END=("END", "max"))
+        bounds = bounds.reindex(range(len(sites)))
+        valid = bounds["START"].notna().to_numpy() & bounds["END"].notna().to_numpy()
+
+        start = np.where(valid, self.toNanos(bounds["START"].fillna(pd.Timestamp(0))), 0)
+        end = np.where(valid, self.toNanos(bounds["END"].fillna(pd.Timestamp(0))), 0)
+        # Same week grid as pd.date_range(start, end, freq="7D")
+        n_weeks = np.where(valid & (end >= start), (end - start) // self.step + 1, 0)
+        base = np.concatenate([[0], np.cumsum(n_weeks)[:-1]]).astype("int64")
+
+        present = np.zeros(int(n_weeks.sum()), dtype=bool)
+        on = dateon.notna().to_numpy()
+        row_site = codes[on]
+        offset = self.toNanos(dateon[on]) - start[row_site]
+        week = offset // self.step
+        aligned = (offset % self.step == 0) & (week >= 0) & (week < n_weeks[row_site]) & valid[row_site]
+        present[base[row_site[aligned]] + week[aligned]] = True
+
+        flat = np.flatnonzero(~present)
+        missing_site = np.searchsorted(base, flat, side="right") - 1
+        # Sites with an empty grid share their base with the next site; side="right" skips past them
+        missing_week = flat - base[missing_site]
+        missing = pd.DataFrame({
+            "SITE_ID": pd.Categorical.from_codes(missing_site, categories=sites),
+            "WEEK": (start[missing_site] + missing_week * self.step).astype("datetime64[ns]"),
+        })
+
+        summary = pd.DataFrame({
+            "SITE_ID": sites,
+            "START_DATE": bounds["START"].dt.date.to_numpy(),
+            "END_DATE": bounds["END"].dt.date.to_numpy(),
+            "MISSING_COUNT": np.bincount(missing_site, minlength=len(sites)),
+        })[valid].reset_index(drop=True)
+        return summary, missing
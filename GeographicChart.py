@@ -1,80 +1,159 @@
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 import os
+from StreamAggregator import StreamAggregator
+from ChartWriter import ChartWriter
 
 class ChemicalMapVisualizer:
-    def __init__(self, loader, coor):
+    MARKER_SIZE = 6
+
+    def __init__(self, loader, coor, cube=None, manifest=None, index=None, compact=False, compact_maps=False):
         self.loader = loader
         self.coor = coor
-        
-    def export(self, fig, label, var, folder_name="assets"):
+        self.cube = cube
+        self.writer = ChartWriter(manifest=manifest, index=index, compact=compact)
+        # compact_maps=True stores site coordinates once and only per-year CONC arrays in the frames
+        self.compact_maps = compact_maps
+        self.sink = None
+        self.aggregator = StreamAggregator(loader)
 
-        folder = os.path.join(folder_name, label.lower())
+    def outputPath(self, label, var, folder_name="assets"):
         filename = f"{label.lower()}_{var}_map.html".replace(" ", "_")
-        os.makedirs(folder, exist_ok=True)
-        path = os.path.join(folder, filename)
-        fig.write_html(path, include_plotlyjs='cdn')
-        
-        print(f"✅ Saved HTML: {filename}")
+        return os.path.join(folder_name, label.lower(), filename)
+
+    def animationControls(self, years):
+        # Same play/pause buttons and year slider that px.scatter_geo(animation_frame=...) generates
+        play = {"frame": {"duration": 500, "redraw": True}, "mode": "immediate",
+                "fromcurrent": True, "transition": {"duration": 500, "easing": "linear"}}
+        jump = {"frame": {"duration": 0, "redraw": True}, "mode": "immediate",
+                "fromcurrent": True, "transition": {"duration": 0, "easing": "linear"}}
+        updatemenus = [dict(type="buttons", direction="left", showactive=False, x=0.1, y=0, xanchor="right",
+                            yanchor="top", pad={"r": 10, "t": 70},
+                            buttons=[dict(label="&#9654;", method="animate", args=[None, play]),
+                                     dict(label="&#9724;", method="animate", args=[[None], jump])])]
+        sliders = [dict(active=0, x=0.1, y=0, len=0.9, xanchor="left", yanchor="top", pad={"b": 10, "t": 60},
+                        currentvalue={"prefix": "YEAR="},
+                        steps=[dict(label=year, method="animate", args=[[year], jump]) for year in years])]
+        return updatemenus, sliders
+
+    def compactMap(self, df_var, title, global_min, global_max):
+        # One trace holds every site's position and name; each year frame restyles only
+        # marker.color (CONC) and marker.size (0 hides sites not sampled that year), indexed by site
+        site_codes, site_ids = pd.factorize(df_var["SITE_ID"].astype(str))
+        year_codes, years = pd.factorize(df_var["YEAR"], sort=True)
+        first = np.unique(site_codes, return_index=True)[1]
+
+        conc = np.full((len(years), len(site_ids)), np.nan, dtype="float32")
+        conc[year_codes, site_codes] = df_var["CONC"].to_numpy(dtype="float32")
+        size = np.zeros((len(years), len(site_ids)), dtype="uint8")
+        size[year_codes, site_codes] = self.MARKER_SIZE
+        # The frame's year is fixed per frame, so it goes into each frame's hovertemplate instead of a per-site array
+        hover = ("<b>%{{hovertext}}</b><br>CONC=%{{marker.color}}<br>YEAR={year}<br>"
+                 "LATITUDE=%{{lat}}<br>LONGITUDE=%{{lon}}<extra></extra>")
+
+        fig = go.Figure(
+            data=[go.Scattergeo(
+                lat=df_var["LATITUDE"].to_numpy()[first],
+                lon=df_var["LONGITUDE"].to_numpy()[first],
+                hovertext=np.asarray(site_ids),
+                mode="markers",
+                marker=dict(color=conc[0], size=size[0], coloraxis="coloraxis"),
+                hovertemplate=hover.format(year=years[0]),
+            )],
+            frames=[go.Frame(name=year, traces=[0],
+                             data=[go.Scattergeo(marker=dict(color=conc[i], size=size[i]),
+                                                 hovertemplate=hover.format(year=year))])
+                    for i, year in enumerate(years)],
+        )
+        updatemenus, sliders = self.animationControls(list(years))
+        fig.update_layout(
+            title=title,
+            template="plotly_dark",
+            height=700,
+            coloraxis=dict(colorscale="Turbo", cmin=global_min, cmax=global_max),
+            updatemenus=updatemenus,
+            sliders=sliders,
+        )
+        return fig
 
-    def plot_Geo_Chart(self, label):
+    def plot_Geo_Chart(self, label, only_variables=None):
 
-        df = self.loader.get(label)
-        if df is None:
-            raise ValueError(f"❌ Dataset '{self.label}' not found in DataLoader.")
+        if label not in self.loader.get_labels():
+            raise ValueError(f"❌ Dataset '{label}' not found in DataLoader.")
         
-        if {"SITE_ID", "VARIABLE", "DATEON", "CONC"}.issubset(df.columns):
-            df = df.copy()
-            df["DATE"] = pd.to_datetime(df["DATEON"], errors="coerce")
-            df["YEAR"] = df["DATE"].dt.year
-           
-            df.drop(columns=[col for col in ["LATITUDE", "LONGITUDE"] if col in df.columns], inplace=True)
-            grouped = df.groupby(["SITE_ID", "VARIABLE", "YEAR"]).agg({"CONC": "mean"}).reset_index()
+        columns = ["SITE_ID", "VARIABLE", "YEAR", "CONC"]
+        if set(columns).issubset(self.loader.getColumns(label)):
+            if self.cube is not None:
+                grouped = self.cube.rollup(label, ["SITE_ID", "VARIABLE", "YEAR"])
+                grouped = grouped[["SITE_ID", "VARIABLE", "YEAR", "CONC"]]
+            elif self.loader.streaming:
+                grouped = self.aggregator.mean(label, ["SITE_ID", "VARIABLE", "YEAR"], columns=columns)
+            else:
+                df = self.loader.get(label, columns=columns)
+                grouped = df.groupby(["SITE_ID", "VARIABLE", "YEAR"], observed=True).agg({"CONC": "mean"}).reset_index()
             grouped = grouped.merge(self.coor, left_on="SITE_ID", right_index=True, how="left")
         else:
             raise ValueError("❌ Missing required columns in the dataset.")
         
         variables = grouped["VARIABLE"].dropna().unique()
+        if only_variables is not None:
+            variables = [var for var in variables if var in only_variables]
+
+        # One pass over the grouped frame: a stable sort by YEAR keeps each variable's rows in frame order,
+        # then per-variable row positions, ranges and extremum rows all come from single groupbys
+        grouped["YEAR"] = grouped["YEAR"].astype(int).astype(str)
+        grouped = grouped.sort_values("YEAR", kind="stable")
+        by_var = grouped.groupby("VARIABLE", sort=False, observed=True)
+        slices = by_var.indices
+        ranges = by_var["CONC"].agg(["min", "max"])
+        valid = grouped[grouped["CONC"].notna()]
+        extremes = valid.groupby("VARIABLE", sort=False, observed=True)["CONC"].agg(["idxmin", "idxmax"])
 
         for var in variables:
-    
-            df_var = grouped[grouped["VARIABLE"] == var].copy()
-            global_min = df_var["CONC"].min()
-            global_max = df_var["CONC"].max()
 
-            if df_var.empty:
+            if var not in slices:
                 print(f"⚠️ No data found for {var}")
                 continue
 
-            df_var["YEAR"] = df_var["YEAR"].astype(int).astype(str)
-            df_var = df_var.sort_values("YEAR")
+            df_var = grouped.iloc[slices[var]]
+            global_min = ranges.at[var, "min"]
+            global_max = ranges.at[var, "max"]
 
-            valid_df = df_var[df_var["CONC"].notna()]
+            path = self.outputPath(label, var)
+            digest = self.writer.manifest.digest(label, str(var), df_var.reset_index(drop=True), self.writer.compact,
+                                                 self.compact_maps)
+            if self.sink is None and not self.writer.stale(path, label, digest, kind="Map", chemical=str(var)):
+                continue
 
-            if valid_df.empty:
+            if var not in extremes.index:
                 max_info = "🔴 Max: N/A"
                 min_info = "🟢 Min: N/A"
             else:
-                max_row = valid_df.loc[valid_df["CONC"].idxmax()]
-                min_row = valid_df.loc[valid_df["CONC"].idxmin()]
+                max_row = grouped.loc[extremes.at[var, "idxmax"]]
+                min_row = grouped.loc[extremes.at[var, "idxmin"]]
                 max_info = f"🔴 Max: {max_row['CONC']:.2f} on {max_row['YEAR']} of {max_row['SITE_ID']} - ({max_row['LATITUDE']},{max_row['LONGITUDE']})"
                 min_info = f"🟢 Min: {min_row['CONC']:.2f} on {min_row['YEAR']} of {min_row['SITE_ID']} - ({min_row['LATITUDE']},{min_row['LONGITUDE']})"
 
-            fig = px.scatter_geo(
-                df_var,
-                lat="LATITUDE",
-                lon="LONGITUDE",
-                color="CONC",
-                hover_name="SITE_ID",
-                hover_data={"CONC": True,"YEAR": True,"LATITUDE": True,"LONGITUDE": True },
-                animation_frame="YEAR",
-                color_continuous_scale="Turbo",
-                range_color=[global_min, global_max],
-                title=f"{label.upper()} - {var} Concentration Over Time<br><sup>{max_info}<br>{min_info}</sup>",
-                template="plotly_dark",
-                height=700,
-            )
+            title = f"{label.upper()} - {var} Concentration Over Time<br><sup>{max_info}<br>{min_info}</sup>"
+            if self.compact_maps:
+                fig = self.compactMap(df_var, title, global_min, global_max)
+            else:
+                fig = px.scatter_geo(
+                    df_var,
+                    lat="LATITUDE",
+                    lon="LONGITUDE",
+                    color="CONC",
+                    hover_name="SITE_ID",
+                    hover_data={"CONC": True,"YEAR": True,"LATITUDE": True,"LONGITUDE": True },
+                    animation_frame="YEAR",
+                    color_continuous_scale="Turbo",
+                    range_color=[global_min, global_max],
+                    title=title,
+                    template="plotly_dark",
+                    height=700,
+                )
 
             fig.update_geos(
                 scope="world",
@@ -90,9 +169,14 @@ class ChemicalMapVisualizer:
                 legend_title="Concentration",
                 coloraxis_colorbar_title="μg/m³"
             )
-            filename = f"{label.lower()}_{var}_map.html".replace(" ", "_")
-            self.export(fig, label, filename)
+            if self.sink is not None:
+                self.sink[var] = fig
+                continue
+            self.writer.save(fig, path, digest)
 
-    def drawGeoChart(self):
+    # scope={label: {variable, ...}} redraws only those maps; None redraws everything
+    def drawGeoChart(self, scope=None):
         for label in ['castnet', 'nadp']:
-            self.plot_Geo_Chart(label)
+            if scope is None or label in scope:
+                self.plot_Geo_Chart(label, None if scope is None else scope[label])
+        self.writer.finish()
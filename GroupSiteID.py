@@ -1,19 +1,24 @@
 import pandas as pd
 import os
+from StreamAggregator import StreamAggregator
 
 class GroupID:
     def __init__(self, loader):
         self.loader = loader
         self.labels = self.loader.get_labels()
         self.results = {}
+        self.aggregator = StreamAggregator(loader)
 
     def countSample(self, label):
-        df = self.loader.get(label)
-        if "SITE_ID" not in df.columns:
+        if "SITE_ID" not in self.loader.getColumns(label):
             print(f"⚠️ File '{label}' doesn't have SITE_ID column")
             return None
 
-        counts = df.groupby("SITE_ID").size().reset_index(name="Sample_count")
+        if self.loader.streaming:
+            counts = self.aggregator.count(label, "SITE_ID").reset_index(name="Sample_count")
+        else:
+            df = self.loader.get(label, columns=["SITE_ID"])
+            counts = df.groupby("SITE_ID", observed=True).size().reset_index(name="Sample_count")
         print(f"📊 File: {label} → {len(counts)} site | Total of samples: {counts['Sample_count'].sum():,}")
         print(counts)
         return counts
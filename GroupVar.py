@@ -1,19 +1,23 @@
 import pandas as pd
-
+from StreamAggregator import StreamAggregator
 import os
 class GroupVars:
     def __init__(self, loader):
         self.loader = loader
         self.labels = self.loader.get_labels()
         self.results = {}
+        self.aggregator = StreamAggregator(loader)
         
     def countSample(self, label):
-        df = self.loader.get(label)
-        if "SITE_ID" not in df.columns:
+        if "VARIABLE" not in self.loader.getColumns(label):
             print(f"⚠️ File '{label}' doesn't have VARIABLE column")
             return None
 
-        counts = df.groupby("VARIABLE").size().reset_index(name="sample_count")
+        if self.loader.streaming:
+            counts = self.aggregator.count(label, "VARIABLE").reset_index(name="sample_count")
+        else:
+            df = self.loader.get(label, columns=["VARIABLE"])
+            counts = df.groupby("VARIABLE", observed=True).size().reset_index(name="sample_count")
         print(f"📊 File: {label} → {len(counts)} variables | Total of samples: {counts['sample_count'].sum():,}")
         print(counts)
         return counts
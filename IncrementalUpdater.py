@@ -0,0 +1,149 @@
+import os
+import json
+import pandas as pd
+from Path import CachePaths
+
+class IncrementalUpdater:
+    def __init__(self, loader, coor, cube, check=None, range100=None, range_all=None,
+                 all_map=None, by_state=None, geo=None, dis=100, cache_dir=CachePaths["Parquet"]):
+        self.loader = loader
+        self.coor = coor
+        self.cube = cube
+        self.check = check
+        self.range100 = range100
+        self.range_all = range_all
+        self.all_map = all_map
+        self.by_state = by_state
+        self.geo = geo
+        self.dis = dis
+        self.folder = os.path.join(cache_dir, "incremental")
+        self.watermark_path = os.path.join(self.folder, "watermark.json")
+
+    def readWatermark(self):
+        # {label: {SITE_ID: last DATEON}}; a site with no dated rows yet is kept with Timestamp.min
+        if not os.path.exists(self.watermark_path):
+            return {}
+        try:
+            with open(self.watermark_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return {label: {site: pd.Timestamp(value) if value is not None else pd.Timestamp.min
+                            for site, value in sites.items()}
+                    for label, sites in data.items()}
+        except (OSError, ValueError, AttributeError, TypeError):
+            # Includes the old one-date-per-label format, which forces a full run
+            return {}
+
+    def latestDates(self, label):
+        # Per site: a site whose data lags the newest one still has its appended rows picked up
+        df = self.loader.get(label, columns=["SITE_ID", "DATEON"])
+        return df.groupby(df["SITE_ID"].astype(str))["DATEON"].max()
+
+    def writeWatermark(self):
+        os.makedirs(self.folder, exist_ok=True)
+        marks = {label: self.latestDates(label) for label in self.loader.get_labels()}
+        with open(self.watermark_path, "w", encoding="utf-8") as f:
+            json.dump({label: {site: mark.isoformat() if pd.notna(mark) else None for site, mark in sites.items()}
+                       for label, sites in marks.items()}, f)
+        print(f"💾 Saved watermark: {self.watermark_path}")
+
+    def statePath(self, name, label):
+        return os.path.join(self.folder, f"{name}_{label.lower()}.parquet")
+
+    def saveState(self):
+        # Analyzer results are kept on disk so the next run only patches the affected sites/dates
+        os.makedirs(self.folder, exist_ok=True)
+        for name, results in self.stateTables().items():
+            for label, df in results.items():
+                df.to_parquet(self.statePath(name, label), index=False)
+
+    def loadState(self, labels):
+        for name, results in self.stateTables().items():
+            for label in labels:
+                path = self.statePath(name, label)
+                if not os.path.exists(path):
+                    return False
+                results[label] = pd.read_parquet(path)
+        return True
+
+    def stateTables(self):
+        tables = {}
+        if self.check is not None:
+            tables["time"] = self.check.TimeResults
+            tables["weeks"] = self.check.MissingWeeks
+        if self.range100 is not None:
+            tables["clusters"] = self.range100.allClusters
+        return tables
+
+    def newRows(self, label, marks):
+        # A row is new when it is dated after its own site's watermark, or belongs to a site never seen
+        sites = self.loader.get(label, columns=["SITE_ID"])["SITE_ID"].astype(str)
+        filters = None
+        if marks and sites.isin(list(marks)).all() and "YEAR" in self.loader.getColumns(label):
+            filters = {"YEAR": slice(min(marks.values()).year, None)}
+        df = self.loader.get(label, filters=filters)
+        mark = df["SITE_ID"].astype(str).map(marks)
+        return df[mark.isna() | (df["DATEON"] > mark)].reset_index(drop=True)
+
+    def fullRun(self):
+        print("🔁 No previous state, running a full build")
+        self.cube.build()
+        if self.check is not None:
+            self.check.analyze()
+        if self.range100 is not None:
+            self.range100.analyze100km(self.dis)
+        if self.range_all is not None:
+            self.range_all.analyzeCause()
+        if self.all_map is not None:
+            self.all_map.drawAllYearly()
+            self.all_map.drawAllMonthly()
+        if self.by_state is not None:
+            self.by_state.drawYearlyByState()
+            self.by_state.drawMonthlyByState()
+        if self.geo is not None:
+            self.geo.drawGeoChart()
+
+    def run(self):
+        labels = self.loader.get_labels()
+        marks = self.readWatermark()
+        if not all(label in marks for label in labels) or not self.loadState(labels) \
+                or not all(self.cube.loadSaved(label) for label in labels):
+            self.fullRun()
+            self.saveState()
+            self.writeWatermark()
+            return
+
+        years, states, pairs, variables = {}, {}, {}, {}
+        for label in labels:
+            rows = self.newRows(label, marks[label])
+            if rows.empty:
+                print(f"✅ {label}: no rows after the per-site watermarks")
+                continue
+            print(f"➕ {label}: {len(rows):,} new rows across {rows['SITE_ID'].nunique():,} site(s)")
+
+            delta = self.cube.applyRows(label, rows)
+            years[label] = set(delta["YEAR"].dropna().astype(int))
+            states[label] = set(delta["STATE"].dropna())
+            keyed = delta.dropna(subset=["STATE", "YEAR"])
+            pairs[label] = set(zip(keyed["STATE"], keyed["YEAR"].astype(int)))
+            variables[label] = set(delta["VARIABLE"].dropna().astype(str))
+
+            if self.check is not None and label in self.check.MissingWeeks:
+                since = self.check.updateSites(label, rows["SITE_ID"].dropna().unique())
+                if since is not None and self.range100 is not None:
+                    self.range100.updateSince(label, since, self.dis)
+
+        if not years:
+            print("✅ Nothing to update")
+            return
+        if self.range_all is not None:
+            self.range_all.analyzeCause()
+        if self.all_map is not None:
+            self.all_map.drawAllYearly(list(years))
+            self.all_map.drawAllMonthly(years)
+        if self.by_state is not None:
+            self.by_state.drawYearlyByState(states)
+            self.by_state.drawMonthlyByState(pairs)
+        if self.geo is not None:
+            self.geo.drawGeoChart(variables)
+        self.saveState()
+        self.writeWatermark()
@@ -1,51 +1,43 @@
-import plotly.graph_objects as go
-import pandas as pd
+import numpy as np
 import plotly.express as px
-import os
+from StreamAggregator import StreamAggregator
+from ChartWriter import ChartWriter
 
 class ChartPlotterAllMap:
 
-    def __init__(self, loader):
+    def __init__(self, loader, cube=None, renderer=None, manifest=None, index=None, compact=False):
         self.loader = loader
-        self.dataframes = loader.dataframes
+        self.cube = cube
+        self.writer = ChartWriter(renderer, manifest, index, compact)
+        self.sink = None
+        self.aggregator = StreamAggregator(loader)
 
     def split_by_gap(self, df, year_col='YEAR', threshold=1):
+        # One frame for the whole chemical: a NaN row before each jump > threshold breaks the line,
+        # so a single trace replaces one trace per segment
         df = df.sort_values(year_col).reset_index(drop=True)
-        segments = []
-        current_segment = [df.iloc[0]]
-
-        for i in range(1, len(df)):
-            prev_year = df.iloc[i - 1][year_col]
-            curr_year = df.iloc[i][year_col]
-            if curr_year - prev_year <= threshold:
-                current_segment.append(df.iloc[i])
-            else:
-                segments.append(pd.DataFrame(current_segment))
-                current_segment = [df.iloc[i]]
-        if current_segment:
-            segments.append(pd.DataFrame(current_segment))
-        return segments
+        starts = np.flatnonzero(df[year_col].diff() > threshold)
+        if len(starts) == 0:
+            return df
+        # Label -1 is not in the index, so reindex fills those rows with NaN
+        return df.reindex(np.insert(df.index.to_numpy(), starts, -1)).reset_index(drop=True)
     
-    def export_html(self, fig, label, filename, folder_name="assets"):
-
-        folder = os.path.join(folder_name, label.lower())
-        os.makedirs(folder, exist_ok=True)
-        file_path = os.path.join(folder, filename)
-        fig.write_html(file_path, include_plotlyjs='cdn')
-
-        print(f"✅ Saved HTML: {file_path}")
-
     def ChartYearly(self, label, title):
-        if label not in self.dataframes:
+        if label not in self.loader.get_labels():
             raise ValueError(f"❌ Can't find data of label: '{label}' in DataLoader.")
 
-        df = self.dataframes[label]
-
         required_cols = {'YEAR', 'VARIABLE', 'CONC'}
-        if not required_cols.issubset(df.columns):
+        if not required_cols.issubset(self.loader.getColumns(label)):
             raise ValueError(f"❌ File '{label}' missing column {required_cols}")
 
-        grouped = df.groupby(['YEAR', 'VARIABLE'])['CONC'].mean().reset_index()
+        if self.cube is not None:
+            grouped = self.cube.rollup(label, ['YEAR', 'VARIABLE'])
+        elif self.loader.streaming:
+            partial = self.aggregator.sumCount(label, ['SITE_ID', 'YEAR', 'VARIABLE'])
+            grouped = self.aggregator.rollup(partial, ['YEAR', 'VARIABLE'])
+        else:
+            df = self.loader.get(label, columns=['YEAR', 'VARIABLE', 'CONC'])
+            grouped = df.groupby(['YEAR', 'VARIABLE'], observed=True)['CONC'].mean().reset_index()
         grouped['YEAR'] = grouped['YEAR'].astype(int)
 
         chemicals = grouped['VARIABLE'].drop_duplicates().tolist()
@@ -53,26 +45,22 @@ class ChartPlotterAllMap:
         color_palette = px.colors.qualitative.Dark24 + px.colors.qualitative.Plotly
         color_map = {chem: color_palette[i % len(color_palette)] for i, chem in enumerate(chemicals)}
 
-        fig = go.Figure()
-        legend_shown = set()
+        traces = []
 
         for chem in chemicals:
             chem_data = grouped[grouped['VARIABLE'] == chem]
-            segments = self.split_by_gap(chem_data)
-
-            for seg in segments:
-                fig.add_trace(go.Scatter(
-                    x=seg['YEAR'],
-                    y=seg['CONC'],
-                    mode='lines',
-                    name=chem if chem not in legend_shown else None,
-                    line=dict(width=3, color=color_map[chem]),
-                    legendgroup=chem,
-                    showlegend=chem not in legend_shown
-                ))
-            legend_shown.add(chem)
-
-        fig.update_layout(
+            seg = self.split_by_gap(chem_data)
+
+            traces.append(dict(
+                x=seg['YEAR'].to_numpy(),
+                y=seg['CONC'].to_numpy(),
+                mode='lines',
+                name=chem,
+                line=dict(width=3, color=color_map[chem]),
+                legendgroup=chem
+            ))
+
+        layout = dict(
             title=title,
             xaxis_title='Year',
             yaxis_title='Average Concentration',
@@ -82,27 +70,23 @@ class ChartPlotterAllMap:
             height=650
         )
         filename = f"{label.lower()}_Yearly_chart.html"
-        self.export_html(fig, label, filename)
-
-    def ChartMonthly(self, label, title):
-        if label not in self.dataframes:
-            raise ValueError(f"❌ Can't find data of label: '{label}' in DataLoader.")
+        self.writer.write(label, filename, {"traces": traces, "layout": layout},
+                          entry=dict(kind='Yearly', state='ALL'), sink=self.sink)
 
-        df = self.dataframes[label]
+    def ChartMonthly(self, label, title, only_years=None):
+        if self.cube is not None:
+            grouped = self.cube.rollup(label, ['YEAR', 'MONTH', 'VARIABLE'])
+        else:
+            df = self.loader.get(label, columns=['YEAR', 'MONTH', 'VARIABLE', 'CONC'])
+            if df is None:
+                raise ValueError(f"❌ Can't find data of label: '{label}' in DataLoader.")
 
-        if 'MONTH' not in df.columns:
-            if 'DATEON' in df.columns:
-                df['DATEON'] = pd.to_datetime(df['DATEON'], errors='coerce')
-                df = df.dropna(subset=['DATEON'])
-                df['MONTH'] = df['DATEON'].dt.month
-            else:
-                raise ValueError("❌ Can't determine MONTH: no DATEON column found.")
             
-        required_cols = {'YEAR','MONTH', 'VARIABLE', 'CONC'}
-        if not required_cols.issubset(df.columns):
-            raise ValueError(f"❌ File '{label}' missing column {required_cols}")
+            required_cols = {'YEAR','MONTH', 'VARIABLE', 'CONC'}
+            if not required_cols.issubset(df.columns):
+                raise ValueError(f"❌ File '{label}' missing column {required_cols}")
 
-        grouped = df.groupby(['YEAR','MONTH', 'VARIABLE'])['CONC'].mean().reset_index()
+            grouped = df.groupby(['YEAR','MONTH', 'VARIABLE'], observed=True)['CONC'].mean().reset_index()
         grouped['YEAR'] = grouped['YEAR'].astype(int)
         grouped['MONTH'] = grouped['MONTH'].astype(int)
 
@@ -111,18 +95,20 @@ class ChartPlotterAllMap:
         color_palette = px.colors.qualitative.Dark24 + px.colors.qualitative.Plotly
         color_map = {chem: color_palette[i % len(color_palette)] for i, chem in enumerate(chemicals)}
         years = sorted(grouped['YEAR'].unique()) 
+        if only_years is not None:
+            years = [year for year in years if year in only_years]
 
         for year in years:
             year_data = grouped[grouped['YEAR'] == year]
-            fig = go.Figure()
+            traces = []
             legend_shown = set()
 
             for chem in chemicals:
                 chem_data = year_data[year_data['VARIABLE'] == chem].sort_values('MONTH')
 
-                fig.add_trace(go.Scatter(
-                    x=chem_data['MONTH'],
-                    y=chem_data['CONC'],
+                traces.append(dict(
+                    x=chem_data['MONTH'].to_numpy(),
+                    y=chem_data['CONC'].to_numpy(),
                     mode='lines+markers',
                     name=chem if chem not in legend_shown else None,
                     line=dict(width=3, color=color_map[chem]),
@@ -131,7 +117,7 @@ class ChartPlotterAllMap:
                 ))
                 legend_shown.add(chem)
 
-            fig.update_layout(
+            layout = dict(
                 title=f"{label.upper()} - Monthly Concentration in {year}",
                 xaxis_title='Month',
                 yaxis_title='Average Concentration',
@@ -144,15 +130,23 @@ class ChartPlotterAllMap:
 
           
             filename = f"{label.lower()}_{year}_Monthly.html"
-            self.export_html(fig, label, filename)
-
-    def drawAllMonthly(self):
-        self.ChartMonthly('castnet', 'CASTNET - Monthly Average per Chemical across The Map')
-        self.ChartMonthly('nadp', 'NADP - Monthly Average per Chemical across The Map')
-
-    def drawAllYearly(self):
-        self.ChartYearly('castnet', 'CASTNET - Yearly Average per Chemical across The Map')
-        self.ChartYearly('nadp', 'NADP - Yearly Average per Chemical across The Map')
+            self.writer.write(label, filename, {"traces": traces, "layout": layout},
+                              entry=dict(kind='Monthly', state='ALL', year=year), sink=self.sink)
+
+    # scope={label: {year, ...}} redraws only those charts; None redraws everything
+    def drawAllMonthly(self, scope=None):
+        for label, title in [('castnet', 'CASTNET - Monthly Average per Chemical across The Map'),
+                             ('nadp', 'NADP - Monthly Average per Chemical across The Map')]:
+            if scope is None or label in scope:
+                self.ChartMonthly(label, title, None if scope is None else scope[label])
+        self.writer.finish()
+
+    def drawAllYearly(self, labels=None):
+        for label, title in [('castnet', 'CASTNET - Yearly Average per Chemical across The Map'),
+                             ('nadp', 'NADP - Yearly Average per Chemical across The Map')]:
+            if labels is None or label in labels:
+                self.ChartYearly(label, title)
+        self.writer.finish()
 
 
 
@@ -1,10 +1,7 @@
-import pandas as pd
-import plotly.graph_objects as go
+import numpy as np
 import plotly.express as px
-import geopandas as gpd
-from shapely.geometry import Point
 from Path import ShapePaths
-import os
+from ChartWriter import ChartWriter
 
 class ChartPlotterByState:
     STATE_FULL_NAMES = {
@@ -23,73 +20,48 @@ class ChartPlotterByState:
     'WY': 'Wyoming'
 }
 
-    def __init__(self, loader, coor,shapefile_path=ShapePaths["USStates"]):
+    def __init__(self, loader, coor,shapefile_path=ShapePaths["USStates"], cube=None, renderer=None, manifest=None, index=None, compact=False):
         self.loader = loader
-        self.dataframes = loader.dataframes
-        self.coor = coor.reset_index().rename(columns={'LAT': 'LATITUDE', 'LON': 'LONGITUDE'})      
+        self.cube = cube
+        self.writer = ChartWriter(renderer, manifest, index, compact)
+        self.sink = None
+        self.coor = coor
         self.shapefile_path = shapefile_path
 
     def split_by_gap(self, df, year_col='YEAR', threshold=1):
+        # One frame for the whole chemical: a NaN row before each jump > threshold breaks the line,
+        # so a single trace replaces one trace per segment
         df = df.sort_values(year_col).reset_index(drop=True)
-        segments = []
-        current_segment = [df.iloc[0]]
-
-        for i in range(1, len(df)):
-            prev_year = df.iloc[i - 1][year_col]
-            curr_year = df.iloc[i][year_col]
-            if curr_year - prev_year <= threshold:
-                current_segment.append(df.iloc[i])
-            else:
-                segments.append(pd.DataFrame(current_segment))
-                current_segment = [df.iloc[i]]
-        if current_segment:
-            segments.append(pd.DataFrame(current_segment))
-        return segments
-
-    def assign_state_by_shapefile(self, df):
-        print("🔄 Gán STATE bằng shapefile...")
-        usa = gpd.read_file(self.shapefile_path)
-        usa = usa[~usa['STUSPS'].isin(['AK', 'HI', 'PR'])]  
-
-        gdf = gpd.GeoDataFrame(
-            df,
-            geometry=[Point(xy) for xy in zip(df['LONGITUDE'], df['LATITUDE'])],
-            crs="EPSG:4326"
-        )
-
-        gdf_joined = gpd.sjoin(gdf, usa[['STUSPS', 'geometry']], how="left", predicate='within')
-        df['STATE'] = gdf_joined['STUSPS'].values
-        return df
+        starts = np.flatnonzero(df[year_col].diff() > threshold)
+        if len(starts) == 0:
+            return df
+        # Label -1 is not in the index, so reindex fills those rows with NaN
+        return df.reindex(np.insert(df.index.to_numpy(), starts, -1)).reset_index(drop=True)
+
+    def assign_state(self, df):
+        # Sites never move: look STATE up by SITE_ID from the cached per-site spatial join
+        return df.assign(STATE=self.loader.stateOf(df['SITE_ID'], self.shapefile_path, self.coor))
 
-          
     def prepare_data_with_state(self, label):
-        if label not in self.dataframes:
+        df = self.loader.get(label, columns=['SITE_ID', 'STATE', 'YEAR', 'MONTH', 'VARIABLE', 'CONC'])
+        if df is None:
             raise ValueError(f"❌ not found data '{label}'.")
 
-        df = self.dataframes[label]
         if 'STATE' not in df.columns:
-            if 'LATITUDE' not in df.columns or 'LONGITUDE' not in df.columns:
-                df = df.merge(self.coor[['SITE_ID', 'LATITUDE', 'LONGITUDE']], on='SITE_ID', how='left')
-            df = self.assign_state_by_shapefile(df)
+            df = self.assign_state(df)
         return df
     
-    def export_html(self, fig, label, filename, folder_name="assets"):
-
-        folder = os.path.join(folder_name, label.lower())  
-        os.makedirs(folder, exist_ok=True)
-        path = os.path.join(folder, filename)
-        fig.write_html(path, include_plotlyjs='cdn')
-
-        print(f"✅ Saved HTML: {path}")
+    def ChartYearlyByState(self, label, title, only_states=None):
+        if self.cube is not None:
+            grouped = self.cube.rollup(label, ['STATE', 'YEAR', 'VARIABLE'])
+        else:
+            df = self.prepare_data_with_state(label)
 
-    def ChartYearlyByState(self, label, title):
-        df = self.prepare_data_with_state(label)
+            required_cols = {'STATE', 'YEAR', 'VARIABLE', 'CONC'}
+            if not required_cols.issubset(df.columns):
+                raise ValueError(f"❌ File '{label}' is missed columns: {required_cols}")
 
-        required_cols = {'STATE', 'YEAR', 'VARIABLE', 'CONC'}
-        if not required_cols.issubset(df.columns):
-            raise ValueError(f"❌ File '{label}' is missed columns: {required_cols}")
-
-        grouped = df.groupby(['STATE', 'YEAR', 'VARIABLE'])['CONC'].mean().reset_index()
+            grouped = df.groupby(['STATE', 'YEAR', 'VARIABLE'], observed=True)['CONC'].mean().reset_index()
         grouped['YEAR'] = grouped['YEAR'].astype(int)
 
         chemicals = grouped['VARIABLE'].drop_duplicates().tolist()
@@ -99,30 +71,28 @@ class ChartPlotterByState:
         color_map = {chem: color_palette[i % len(color_palette)] for i, chem in enumerate(chemicals)}
 
         for state in sorted(states):
+            if only_states is not None and state not in only_states:
+                continue
             state_data = grouped[grouped['STATE'] == state]
-            fig = go.Figure()
-            legend_shown = set()
+            traces = []
 
             for chem in chemicals:
                 chem_data = state_data[state_data['VARIABLE'] == chem]
                 if chem_data.empty:
                     continue
 
-                segments = self.split_by_gap(chem_data)
+                seg = self.split_by_gap(chem_data)
 
-                for seg in segments:
-                    fig.add_trace(go.Scatter(
-                        x=seg['YEAR'],
-                        y=seg['CONC'],
-                        mode='lines+markers',
-                        name=chem if chem not in legend_shown else None,
-                        line=dict(width=2.5, color=color_map[chem]),
-                        legendgroup=chem,
-                        showlegend=chem not in legend_shown
-                    ))
-                legend_shown.add(chem)
+                traces.append(dict(
+                    x=seg['YEAR'].to_numpy(),
+                    y=seg['CONC'].to_numpy(),
+                    mode='lines+markers',
+                    name=chem,
+                    line=dict(width=2.5, color=color_map[chem]),
+                    legendgroup=chem
+                ))
             full_state = self.STATE_FULL_NAMES.get(state, state)
-            fig.update_layout(
+            layout = dict(
                 title=f"{title} - {full_state}" if title else f"{label.upper()} - {full_state}",
                 xaxis_title='Year',
                 yaxis_title='Avg Concentration',
@@ -133,29 +103,30 @@ class ChartPlotterByState:
             )
 
             filename = f"{label.lower()}_{state}_Yearly_chart.html"
-            self.export_html(fig, label, filename)
+            self.writer.write(label, filename, {"traces": traces, "layout": layout},
+                              entry=dict(kind='Yearly', state=state), sink=self.sink)
 
-    def drawYearlyByState(self):
-        self.ChartYearlyByState('castnet', 'CASTNET - Yearly Average per Chemical by State')
-        self.ChartYearlyByState('nadp','NADP - Yearly Average per Chemical by State')
+    # scope={label: {state, ...}} redraws only those charts; None redraws everything
+    def drawYearlyByState(self, scope=None):
+        for label, title in [('castnet', 'CASTNET - Yearly Average per Chemical by State'),
+                             ('nadp', 'NADP - Yearly Average per Chemical by State')]:
+            if scope is None or label in scope:
+                self.ChartYearlyByState(label, title, None if scope is None else scope[label])
+        self.writer.finish()
 
 ##########################################################################################
     
-    def ChartMonthlyByState(self, label, title_prefix):
-        df = self.prepare_data_with_state(label)
-
-        if 'MONTH' not in df.columns:
-            if 'DATEON' in df.columns:
-                df['DATEON'] = pd.to_datetime(df['DATEON'], errors='coerce')
-                df = df.dropna(subset=['DATEON'])
-                df['MONTH'] = df['DATEON'].dt.month
-            else:
-                raise ValueError("❌ Can't determine MONTH: no DATEON column found.")
-
-        required_cols = {'STATE', 'YEAR', 'MONTH', 'VARIABLE', 'CONC'}
-        if not required_cols.issubset(df.columns):
-            raise ValueError(f"❌ File '{label}' is missed columns: {required_cols}")
-        grouped = df.groupby(['STATE', 'YEAR', 'MONTH', 'VARIABLE'])['CONC'].mean().reset_index()
+    def ChartMonthlyByState(self, label, title_prefix, pairs=None):
+        if self.cube is not None:
+            grouped = self.cube.rollup(label, ['STATE', 'YEAR', 'MONTH', 'VARIABLE'])
+        else:
+            df = self.prepare_data_with_state(label)
+
+
+            required_cols = {'STATE', 'YEAR', 'MONTH', 'VARIABLE', 'CONC'}
+            if not required_cols.issubset(df.columns):
+                raise ValueError(f"❌ File '{label}' is missed columns: {required_cols}")
+            grouped = df.groupby(['STATE', 'YEAR', 'MONTH', 'VARIABLE'], observed=True)['CONC'].mean().reset_index()
         grouped['MONTH'] = grouped['MONTH'].astype(int)
         grouped['YEAR'] = grouped['YEAR'].astype(int)
 
@@ -170,34 +141,32 @@ class ChartPlotterByState:
             state_data = grouped[grouped['STATE'] == state]
 
             for year in years:
+                if pairs is not None and (state, year) not in pairs:
+                    continue
                 year_data = state_data[state_data['YEAR'] == year]
                 if year_data.empty:
                     continue
 
-                fig = go.Figure()
-                legend_shown = set()
+                traces = []
 
                 for chem in chemicals:
                     chem_data = year_data[year_data['VARIABLE'] == chem]
                     if chem_data.empty:
                         continue
 
-                    segments = self.split_by_gap(chem_data, year_col='MONTH', threshold=1)
+                    seg = self.split_by_gap(chem_data, year_col='MONTH', threshold=1)
 
-                    for seg in segments:
-                        fig.add_trace(go.Scatter(
-                            x=seg['MONTH'],
-                            y=seg['CONC'],
-                            mode='lines+markers',
-                            name=chem if chem not in legend_shown else None,
-                            line=dict(width=2.5, color=color_map[chem]),
-                            legendgroup=chem,
-                            showlegend=chem not in legend_shown
-                        ))
-                    legend_shown.add(chem)
+                    traces.append(dict(
+                        x=seg['MONTH'].to_numpy(),
+                        y=seg['CONC'].to_numpy(),
+                        mode='lines+markers',
+                        name=chem,
+                        line=dict(width=2.5, color=color_map[chem]),
+                        legendgroup=chem
+                    ))
 
                 full_state = self.STATE_FULL_NAMES.get(state, state)
-                fig.update_layout(
+                layout = dict(
                     title=f"{title_prefix} - {full_state} - {year}",
                     xaxis_title='Month',
                     yaxis=dict(title='Avg Concentration'),
@@ -208,9 +177,14 @@ class ChartPlotterByState:
                 )
 
                 filename = f"{label.lower()}_{state}_{year}_Monthly_chart.html"
-                self.export_html(fig, label, filename)
+                self.writer.write(label, filename, {"traces": traces, "layout": layout},
+                                  entry=dict(kind='Monthly', state=state, year=year), sink=self.sink)
                 
-    def drawMonthlyByState(self):
-        self.ChartMonthlyByState('castnet', 'CASTNET - Monthly Avg per Chemical by state')
-        self.ChartMonthlyByState('nadp', 'NADP - Monthly Avg per Chemical by state')
+    # scope={label: {(state, year), ...}} redraws only those charts; None redraws everything
+    def drawMonthlyByState(self, scope=None):
+        for label, title in [('castnet', 'CASTNET - Monthly Avg per Chemical by state'),
+                             ('nadp', 'NADP - Monthly Avg per Chemical by state')]:
+            if scope is None or label in scope:
+                self.ChartMonthlyByState(label, title, None if scope is None else scope[label])
+        self.writer.finish()
 
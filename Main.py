@@ -11,10 +11,18 @@ from Dashboard import ChemicalDashboardApp
 from ButterflyChart import DualButterflyChartPlotter
 from Ranking import MissingDataRanker
 from PieChart import ChemicalPieVisualizer
+from AggregationCube import AggregationCube
+from IncrementalUpdater import IncrementalUpdater
+from FigureRenderer import FigureRenderer
+from FigureStore import FigureStore
 
 if __name__ == "__main__":
 # Read dataset & get coordinates(by siteid) from file csv
     # loader = DataLoader()
+    # loader = DataLoader(lazy=True)   # read columns/rows on demand: loader.get(label, columns=[...], filters={...})
+    # loader = DataLoader(streaming=True, chunksize=500_000)   # constant memory: counts/means aggregated chunk by chunk
+    # loader = DataLoader(workers=8)   # parse CSVs in a process pool, prints per-file timing (loader.loadReport)
+    # loader = DataLoader(compact=True)   # SITE_ID/VARIABLE/STATE share one categorical dictionary across labels, prints memory per label (loader.memoryReport)
     # coor = loader.getCoordinates()
 
 # Overview: group by siteID
@@ -35,6 +43,7 @@ if __name__ == "__main__":
 # Statistics of nearby siteID missing samples at the same time (range: 100km-cluster)
     # range100= MissingPatternAnalyzer_100km(check,coor)
     # range100.analyze100km()
+    # range100.sweep(radii=[50, 100, 200])   # optional: one sheet per radius, shared distance matrix
     # range100.export()
 
 # Statistics of nearby siteID missing samples at the same time (range: map)
@@ -42,6 +51,22 @@ if __name__ == "__main__":
     # rangeAll.analyzeCause()
     # rangeAll.export()
 
+# Aggregation cube (label, SITE_ID, STATE, YEAR, MONTH, VARIABLE) shared by the charts below
+    # cube = AggregationCube(loader, coor)
+    # cube.build()
+    # pass cube=cube to ChartPlotterAllMap / ChartPlotterByState / ChemicalMapVisualizer / ChemicalPieVisualizer
+
+# Incremental refresh: only rows newer than the last DATEON watermark are folded in and redrawn
+    # updater = IncrementalUpdater(loader, coor, cube, check, range100, rangeAll,
+    #                              ChartPlotterAllMap(loader, cube=cube), ChartPlotterByState(loader, coor, cube=cube),
+    #                              ChemicalMapVisualizer(loader, coor, cube=cube))
+    # updater.run()   # first run builds everything; later runs patch cube/analyzers and redraw affected charts
+
+# Optional: write the line-graph HTML files from a process pool (pass renderer=renderer to the plotters below)
+    # renderer = FigureRenderer(workers=8)   # prints progress and a timing row per draw (renderer.report)
+    # pass compact=True to the plotters (and Pie.export / rank.export) for offline assets: one local plotly.min.js + slim JSON per chart
+    # ChemicalMapVisualizer(..., compact_maps=True) keeps site coordinates once and only per-year CONC arrays in each frame
+
 # Line graph (range: map)
     # chartAllMap=ChartPlotterAllMap(loader)
     # chartAllMap.drawAllYearly()
@@ -73,6 +98,7 @@ if __name__ == "__main__":
 
 # Dashboard of all HTML files
     dashboard = ChemicalDashboardApp()
+    # dashboard = ChemicalDashboardApp(store=FigureStore(loader, coor, AggregationCube(loader, coor)), prewarm=True)   # build charts on demand, no assets/ HTML needed; cache stats at /debug/figure-cache
     dashboard.run()
 
     
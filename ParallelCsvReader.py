@@ -0,0 +1,112 @@
+import io
+import os
+import time
+import numpy as np
+import pandas as pd
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from DateParser import DateParser
+
+CSV_OPTIONS = {
+    "low_memory": False,
+    "na_values": ["", "NaN", "NAN", "null", "NULL"],
+    "keep_default_na": False,
+}
+
+def splitRanges(path, split_size):
+    # Ranges end on line boundaries; the weekly CSVs have no quoted multi-line fields
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, "rb") as f:
+        header = f.readline()
+        start = f.tell()
+        while start < size:
+            f.seek(min(start + split_size, size))
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return header, ranges
+
+def parseRange(path, header, start, end, cache=None):
+    began = time.perf_counter()
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    df = pd.read_csv(io.BytesIO(header + data), **CSV_OPTIONS)
+    kinds = {col: df[col].dtype.kind for col in df.columns}
+    if cache is not None:
+        # Pinning in the worker also shrinks what is pickled back to the parent
+        df = cache.pinDtypes(df)
+    else:
+        df = DateParser().prepare(df)
+    return df, kinds, time.perf_counter() - began
+
+def reconcile(path, pieces, kinds, cache=None):
+    # Splits infer dtypes on their own; a column read as numbers in one split and text in another is re-read whole
+    found = defaultdict(set)
+    for part in kinds:
+        for col, kind in part.items():
+            found[col].add("n" if kind in "iuf" else kind)
+    mixed = [col for col, seen in found.items() if len(seen) > 1]
+    if not mixed:
+        return pieces
+    print(f"  ↺ {os.path.basename(path)}: re-reading {mixed}, splits inferred different dtypes")
+    fixed = pd.read_csv(path, usecols=mixed, **CSV_OPTIONS)
+    fixed = cache.pinDtypes(fixed) if cache is not None else DateParser().prepare(fixed)
+    columns = list(mixed)
+    if "DATEON" in mixed:
+        columns += [col for col in DateParser.PARTS if col not in found]
+    bounds = np.cumsum([0] + [len(piece) for piece in pieces])
+    return [piece.assign(**{col: fixed[col].iloc[bounds[i]:bounds[i + 1]].set_axis(piece.index) for col in columns})
+            for i, piece in enumerate(pieces)]
+
+class ParallelCsvReader:
+    def __init__(self, workers=None, split_size=256 * 1024 ** 2):
+        self.workers = workers or os.cpu_count()
+        self.split_size = split_size
+
+    def read(self, tasks, cache=None):
+        parts = defaultdict(dict)
+        kinds = defaultdict(dict)
+        busy = defaultdict(float)
+        finished = {}
+        splits = {}
+
+        began = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = {}
+            for label, path in tasks:
+                header, ranges = splitRanges(path, self.split_size)
+                if not ranges:
+                    ranges = [(len(header), len(header))]
+                splits[(label, path)] = len(ranges)
+                for i, (start, end) in enumerate(ranges):
+                    futures[pool.submit(parseRange, path, header, start, end, cache)] = (label, path, i)
+
+            for future in as_completed(futures):
+                label, path, i = futures[future]
+                df, part_kinds, elapsed = future.result()
+                parts[(label, path)][i] = df
+                kinds[(label, path)][i] = part_kinds
+                busy[(label, path)] += elapsed
+                finished[(label, path)] = time.perf_counter() - began
+
+        frames = {(label, path): reconcile(path, [pieces[i] for i in sorted(pieces)],
+                                           [kinds[(label, path)][i] for i in sorted(pieces)], cache)
+                  for (label, path), pieces in parts.items()}
+        report = []
+        for label, path in tasks:
+            mb = os.path.getsize(path) / 1024 ** 2
+            wall = finished[(label, path)]
+            report.append({
+                "LABEL": label,
+                "FILE": os.path.basename(path),
+                "SOURCE": f"csv x{self.workers} workers",
+                "SPLITS": splits[(label, path)],
+                "MB": round(mb, 1),
+                "CPU_SECONDS": round(busy[(label, path)], 2),
+                "SECONDS": round(wall, 2),
+                "MB_PER_S": round(mb / wall, 1) if wall else None,
+            })
+        return frames, report
@@ -0,0 +1,100 @@
+import os
+import json
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from Path import CachePaths
+from DateParser import DateParser
+
+class ParquetCache:
+    VERSION = 3
+    PARTITION_COL = "YEAR"
+    CATEGORY_COLS = ["SITE_ID", "VARIABLE"]
+    FLOAT_COLS = ["CONC"]
+
+    # Declared rather than inferred from the folder names, so a warm load gives YEAR the dtype the frame was stored with
+    PARTITIONING = ds.partitioning(pa.schema([(PARTITION_COL, pa.int16())]), flavor="hive")
+
+    def __init__(self, cache_dir=CachePaths["Parquet"]):
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.dates = DateParser()
+
+    def entryDir(self, label, path):
+        stem = os.path.splitext(os.path.basename(path))[0]
+        return os.path.join(self.cache_dir, label.lower(), stem)
+
+    def sourceKey(self, path):
+        stat = os.stat(path)
+        return {"version": self.VERSION, "size": stat.st_size, "mtime": stat.st_mtime_ns}
+
+    def isValid(self, label, path):
+        meta_path = os.path.join(self.entryDir(label, path), "_meta.json")
+        if not os.path.exists(meta_path):
+            return False
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f) == self.sourceKey(path)
+        except (OSError, ValueError):
+            return False
+
+    def pinDtypes(self, df):
+        for col in self.CATEGORY_COLS:
+            if col in df.columns:
+                df[col] = df[col].astype("category")
+        # DATEON/DATEOFF are parsed once here, with YEAR/MONTH/WEEK stored next to them
+        df = self.dates.prepare(df)
+        if self.PARTITION_COL in df.columns:
+            df[self.PARTITION_COL] = pd.to_numeric(df[self.PARTITION_COL], errors="coerce").astype("Int16")
+        for col in self.FLOAT_COLS:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors="coerce").astype("float32")
+        return df
+
+    def storeTable(self, name, df, key):
+        # Small derived tables (e.g. site lookups) live next to the label folders with their own key
+        df.to_parquet(os.path.join(self.cache_dir, f"{name}.parquet"), index=False)
+        with open(os.path.join(self.cache_dir, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, **key}, f)
+
+    def loadTable(self, name, key):
+        data_path = os.path.join(self.cache_dir, f"{name}.parquet")
+        meta_path = os.path.join(self.cache_dir, f"{name}.json")
+        if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+            return None
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                if json.load(f) != {"version": self.VERSION, **key}:
+                    return None
+        except (OSError, ValueError):
+            return None
+        return pd.read_parquet(data_path)
+
+    def store(self, label, path, df):
+        target = self.entryDir(label, path)
+        shutil.rmtree(target, ignore_errors=True)
+        os.makedirs(target, exist_ok=True)
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        partitioning = self.PARTITIONING if self.PARTITION_COL in df.columns else None
+        ds.write_dataset(table, target, format="parquet", partitioning=partitioning,
+                         existing_data_behavior="overwrite_or_ignore")
+
+        # Written last so an interrupted store never looks valid
+        with open(os.path.join(target, "_meta.json"), "w", encoding="utf-8") as f:
+            json.dump(self.sourceKey(path), f)
+        print(f"  💾 Cached: {target}")
+
+    def dataset(self, label, path):
+        dataset = ds.dataset(self.entryDir(label, path), format="parquet", partitioning=self.PARTITIONING)
+        meta = dataset.schema.pandas_metadata
+        if not meta:
+            return dataset
+        # The partition column is appended after the file columns; put every column back where the source had it
+        order = [col["name"] for col in meta["columns"] if col["name"] in dataset.schema.names]
+        return dataset.replace_schema(pa.schema([dataset.schema.field(col) for col in order],
+                                                metadata=dataset.schema.metadata))
+
+    def load(self, label, path):
+        return self.dataset(label, path).to_table().to_pandas()
@@ -1,3 +1,5 @@
+import os
+
 DatasetPaths = {
     'castnet': [
         r"D:\ChemicalExposure\Chem_Visual\RawData\RAW_CASTNET\TDEP_MEASURED_WEEK_2013current.csv",
@@ -11,3 +13,7 @@ DatasetPaths = {
 ShapePaths = {
     "USStates": r"D:\ChemicalExposure\Shapefiles\cb_2018_us_state_20m.shp"
 }
+
+CachePaths = {
+    "Parquet": os.path.join(os.path.dirname(os.path.abspath(__file__)), "Cache")
+}
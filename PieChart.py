@@ -2,10 +2,12 @@ import plotly.graph_objects as go
 import pandas as pd
 from plotly.subplots import make_subplots
 import os
+from CompactFigure import writeFigure
 
 class ChemicalPieVisualizer:
-    def __init__(self, loader):
+    def __init__(self, loader, cube=None):
         self.loader = loader
+        self.cube = cube
 
     def drawPie(self):
         labels = self.loader.get_labels()
@@ -16,13 +18,15 @@ class ChemicalPieVisualizer:
         )
 
         for i, label in enumerate(labels):
-            df = self.loader.get(label)
-            if df is None or "VARIABLE" not in df.columns or "CONC" not in df.columns:
-                print(f"⚠️ Skipping {label} due to missing VARIABLE or CONC columns.")
-                continue
-            df = df.copy()
-            df['CONC'] = pd.to_numeric(df['CONC'], errors='coerce') 
-            grouped = df.groupby("VARIABLE")["CONC"].mean().dropna()
+            if self.cube is not None:
+                grouped = self.cube.rollup(label, ["VARIABLE"]).set_index("VARIABLE")["CONC"].dropna()
+            else:
+                df = self.loader.get(label, columns=["VARIABLE", "CONC"])
+                if df is None or "VARIABLE" not in df.columns or "CONC" not in df.columns:
+                    print(f"⚠️ Skipping {label} due to missing VARIABLE or CONC columns.")
+                    continue
+                df = df.assign(CONC=pd.to_numeric(df['CONC'], errors='coerce'))
+                grouped = df.groupby("VARIABLE", observed=True)["CONC"].mean().dropna()
             if grouped.empty:
                 print(f"⚠️ No valid data to plot for {label}")
                 continue
@@ -76,10 +80,10 @@ class ChemicalPieVisualizer:
         fig.show()
         self.fig=fig
         
-    def export(self, filename="Pie_Chart.html"):
+    def export(self, filename="Pie_Chart.html", compact=False):
         os.makedirs("assets", exist_ok=True)  
         path = os.path.join("assets", filename)
-        self.fig.write_html(path)
+        writeFigure(self.fig, path, compact, "assets", include_plotlyjs=True)
         print(f"✅ Exported to: {path}")
 
 
@@ -2,6 +2,7 @@ import os
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from CompactFigure import writeFigure
 
 class MissingDataRanker:
     def __init__(self, folder="Excel_Result", keyword="Time"):
@@ -54,10 +55,10 @@ class MissingDataRanker:
         fig.update_layout( margin=dict(t=40, b=30))
         self.fig = fig 
         fig.show()
-    def export(self, filename="sample_loss_result.html"):
+    def export(self, filename="sample_loss_result.html", compact=False):
         os.makedirs("assets", exist_ok=True)  
         path = os.path.join("assets", filename)
-        self.fig.write_html(path)
+        writeFigure(self.fig, path, compact, "assets", include_plotlyjs=True)
         print(f"✅ Exported to: {path}")
 
     def draw(self):
@@ -1,28 +1,260 @@
+import os
+import time
+import numpy as np
 import pandas as pd
-from Path import DatasetPaths
+import pyarrow.dataset as ds
+import geopandas as gpd
+from Path import DatasetPaths, CachePaths, ShapePaths
+from ParquetCache import ParquetCache
+from ParallelCsvReader import ParallelCsvReader, CSV_OPTIONS
+from DateParser import DateParser
 class DataLoader:
-    def __init__(self):
-    
+    COMPACT_COLS = ["SITE_ID", "VARIABLE"]
+
+    def __init__(self, use_cache=True, cache_dir=CachePaths["Parquet"], lazy=False,
+                 streaming=False, chunksize=500_000, workers=1, split_size=256 * 1024 ** 2, compact=False):
+
         self.dataframes = {}
+        self.labels = []
+        self.cache = ParquetCache(cache_dir) if use_cache else None
+        # Lazy mode only prepares the cache; frames are read on demand by get()
+        self.lazy = lazy and self.cache is not None
+        # Streaming mode holds nothing in memory; consumers aggregate over iterChunks()
+        self.streaming = streaming
+        self.chunksize = chunksize
+        # Compact mode recodes the frames held in memory; lazy and streaming reads hold none
+        self.compact = compact and not self.lazy and not self.streaming
+        # column -> CategoricalDtype shared by every label (SITE_ID, VARIABLE, and STATE once looked up)
+        self.categories = {}
+        self.memoryReport = pd.DataFrame()
+        # workers > 1 parses CSVs (and byte-range splits of large ones) in a process pool
+        self.reader = ParallelCsvReader(workers, split_size) if workers > 1 else None
+        self.parsed = {}
+        # Raw CSV reads (no cache) get the same one-time date parsing as cached ones
+        self.dates = self.cache.dates if self.cache is not None else DateParser()
+        self.states = {}
+        self.loadReport = []
         self.readAll()
 
+    def readCsv(self, path, **kwargs):
+        return pd.read_csv(path, **{**CSV_OPTIONS, **kwargs})
+
+    def csvColumns(self, columns):
+        if columns is None:
+            return None
+        needed = set(columns)
+        # Date parts are derived from DATEON, so it is read whenever one of them is requested
+        if needed & set(DateParser.PARTS):
+            needed.add("DATEON")
+        return lambda col: col in needed
+
+    def record(self, label, path, source, began):
+        seconds = time.perf_counter() - began
+        mb = os.path.getsize(path) / 1024 ** 2
+        self.loadReport.append({"LABEL": label, "FILE": os.path.basename(path), "SOURCE": source,
+                                "SPLITS": 1, "MB": round(mb, 1), "CPU_SECONDS": round(seconds, 2),
+                                "SECONDS": round(seconds, 2), "MB_PER_S": round(mb / seconds, 1) if seconds else None})
+
+    def parseParallel(self):
+        tasks = [(label, path) for label, paths in DatasetPaths.items() for path in paths
+                 if self.cache is None or not self.cache.isValid(label, path)]
+        if not tasks:
+            return
+        print(f"⚙️ Parsing {len(tasks)} file(s) with {self.reader.workers} workers")
+        frames, report = self.reader.read(tasks, self.cache)
+        self.loadReport += report
+        for (label, path), parts in frames.items():
+            df = self.concatFrames(parts)
+            if self.cache is not None:
+                self.cache.store(label, path, df)
+            if not self.lazy:
+                self.parsed[(label, path)] = df
+
+    def readFile(self, label, path):
+        if (label, path) in self.parsed:
+            return self.parsed.pop((label, path))
+        began = time.perf_counter()
+        if self.cache is None:
+            df = self.dates.prepare(self.readCsv(path))
+            self.record(label, path, "csv", began)
+            return df
+        if self.cache.isValid(label, path):
+            print("    ⚡ Loaded from Parquet cache")
+            df = self.cache.load(label, path)
+            self.record(label, path, "parquet cache", began)
+            return df
+        df = self.cache.pinDtypes(self.readCsv(path))
+        self.record(label, path, "csv", began)
+        self.cache.store(label, path, df)
+        return df
+
+    def concatFrames(self, dfs):
+        # pd.concat falls back to object dtype when category sets differ between files
+        for col in set().union(*[df.columns for df in dfs]):
+            if all(col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype) for df in dfs):
+                dtype = pd.CategoricalDtype(sorted(set().union(*[df[col].cat.categories for df in dfs])))
+                for df in dfs:
+                    df[col] = df[col].astype(dtype)
+        return pd.concat(dfs, ignore_index=True)
+
+    def ensureCached(self, label, path):
+        if self.cache.isValid(label, path):
+            print("    ⚡ Parquet cache is up to date")
+            return
+        self.cache.store(label, path, self.cache.pinDtypes(self.readCsv(path)))
+
     def readAll(self):
+        if self.reader is not None and not self.streaming:
+            self.parseParallel()
         for label, paths in DatasetPaths.items():
             print(f"📂 Reading file: {label}")
+            self.labels.append(label)
+            if self.streaming:
+                print(f"✅ {label}: registered for streaming in chunks of {self.chunksize:,} rows")
+                continue
+            if self.lazy:
+                for path in paths:
+                    print(f"  ↳ {path}")
+                    self.ensureCached(label, path)
+                print(f"✅ {label}: registered for on-demand reads")
+                continue
             dfs = []
             for path in paths:
                 print(f"  ↳ {path}")
-                df = pd.read_csv(path, low_memory=False,
-                                 na_values=["", "NaN", "NAN", "null", "NULL"],
-                                 keep_default_na=False)
-                dfs.append(df)
-            self.dataframes[label] = pd.concat(dfs, ignore_index=True)
+                dfs.append(self.readFile(label, path))
+            self.dataframes[label] = self.concatFrames(dfs)
             print(f"✅ {label}: {len(self.dataframes[label]):,} rows | {self.dataframes[label].shape[1]} columns")
+        self.loadReport = pd.DataFrame(self.loadReport)
+        if not self.loadReport.empty:
+            print("⏱️ Load timing per file:")
+            print(self.loadReport.to_string(index=False))
+        if self.compact:
+            self.compactFrames()
+
+    def compactFrames(self):
+        # One dictionary per column across labels, so a code means the same site/variable in castnet and nadp
+        for col in self.COMPACT_COLS:
+            values = set()
+            for df in self.dataframes.values():
+                if col in df.columns:
+                    values |= set(df[col].dropna().unique())
+            self.categories[col] = pd.CategoricalDtype(sorted(values))
+
+        report = []
+        for label, df in self.dataframes.items():
+            usage = df.memory_usage(deep=True)
+            loaded = usage.sum()
+            # The cache already loads these columns as per-file categoricals, so savings are measured
+            # against plain object strings; the as-loaded size is reported next to it
+            before = loaded - sum(usage[col] - df[col].astype(object).memory_usage(deep=True, index=False)
+                                  for col in self.categories if col in df.columns)
+            for col, dtype in self.categories.items():
+                if col in df.columns:
+                    df[col] = df[col].astype(dtype)
+            after = df.memory_usage(deep=True).sum()
+            report.append({"LABEL": label, "ROWS": len(df), "MB_OBJECT": round(before / 1024 ** 2, 1),
+                           "MB_LOADED": round(loaded / 1024 ** 2, 1), "MB_AFTER": round(after / 1024 ** 2, 1),
+                           "SAVED_%": round(100 * (1 - after / before), 1) if before else None})
+        self.memoryReport = pd.DataFrame(report)
+        print("🧮 Memory per label (shared categories):")
+        print(self.memoryReport.to_string(index=False))
+
+    def toExpression(self, label, filters, names):
+        expr = None
+        for col, value in filters.items():
+            if col not in names:
+                raise KeyError(f"❌ Can't filter '{label}' on missing column '{col}'")
+            field = ds.field(col)
+            if isinstance(value, range) and value.step == 1:
+                cond = (field >= value.start) & (field < value.stop)
+            elif isinstance(value, slice):
+                cond = None
+                if value.start is not None:
+                    cond = field >= value.start
+                if value.stop is not None:
+                    cond = field < value.stop if cond is None else cond & (field < value.stop)
+                if cond is None:
+                    continue
+            elif isinstance(value, (range, list, tuple, set, pd.Index)):
+                cond = field.isin(list(value))
+            else:
+                cond = field == value
+            expr = cond if expr is None else expr & cond
+        return expr
+
+    def filterFrame(self, label, df, columns=None, filters=None):
+        if filters:
+            mask = pd.Series(True, index=df.index)
+            for col, value in filters.items():
+                if col not in df.columns:
+                    raise KeyError(f"❌ Can't filter '{label}' on missing column '{col}'")
+                if isinstance(value, range) and value.step == 1:
+                    mask &= (df[col] >= value.start) & (df[col] < value.stop)
+                elif isinstance(value, slice):
+                    if value.start is not None:
+                        mask &= df[col] >= value.start
+                    if value.stop is not None:
+                        mask &= df[col] < value.stop
+                elif isinstance(value, (range, list, tuple, set, pd.Index)):
+                    mask &= df[col].isin(list(value))
+                else:
+                    mask &= df[col] == value
+            df = df[mask]
+        if columns is not None:
+            df = df[[col for col in columns if col in df.columns]]
+        return df.reset_index(drop=True) if filters else df
+
+    def query(self, label, columns=None, filters=None):
+        if label in self.dataframes:
+            return self.filterFrame(label, self.dataframes[label], columns, filters)
+
+        dfs = []
+        for path in DatasetPaths[label]:
+            if self.cache is None or not self.cache.isValid(label, path):
+                usecols = None if columns is None else set(columns) | set(filters or {})
+                df = self.dates.prepare(self.readCsv(path, usecols=self.csvColumns(usecols)))
+                dfs.append(self.filterFrame(label, df, columns, filters))
+                continue
+            dataset = self.cache.dataset(label, path)
+            names = dataset.schema.names
+            cols = None if columns is None else [col for col in columns if col in names]
+            expr = self.toExpression(label, filters, names) if filters else None
+            dfs.append(dataset.to_table(columns=cols, filter=expr).to_pandas())
+        return self.concatFrames(dfs)
+
+    def iterChunks(self, label, columns=None):
+        for path in DatasetPaths[label]:
+            if self.cache is not None and self.cache.isValid(label, path):
+                dataset = self.cache.dataset(label, path)
+                cols = None if columns is None else [col for col in columns if col in dataset.schema.names]
+                for batch in dataset.to_batches(columns=cols, batch_size=self.chunksize):
+                    yield batch.to_pandas()
+            else:
+                for chunk in self.readCsv(path, usecols=self.csvColumns(columns), chunksize=self.chunksize):
+                    chunk = self.dates.prepare(chunk)
+                    yield chunk if columns is None else chunk[[col for col in columns if col in chunk.columns]]
+
+    def getColumns(self, label):
+        columns = []
+        for path in DatasetPaths.get(label, []):
+            if self.cache is not None and self.cache.isValid(label, path):
+                names = self.cache.dataset(label, path).schema.names
+            else:
+                names = list(self.readCsv(path, nrows=0).columns)
+                if "DATEON" in names:
+                    names += [col for col in DateParser.PARTS if col not in names]
+            columns += [col for col in names if col not in columns]
+        return columns
     
     def getCoordinates(self):
         all_data = []
         for label in self.get_labels():
-            df = self.get(label)
+            if self.streaming:
+                if {"SITE_ID", "LATITUDE", "LONGITUDE"}.issubset(self.getColumns(label)):
+                    for chunk in self.iterChunks(label, columns=["SITE_ID", "LATITUDE", "LONGITUDE"]):
+                        all_data.append(chunk.drop_duplicates(subset="SITE_ID"))
+                continue
+            df = self.get(label, columns=["SITE_ID", "LATITUDE", "LONGITUDE"])
             if {"SITE_ID", "LATITUDE", "LONGITUDE"}.issubset(df.columns):
                 all_data.append(df[["SITE_ID", "LATITUDE", "LONGITUDE"]])
 
@@ -31,13 +263,67 @@ class DataLoader:
             return merged
         else:
             return pd.DataFrame(columns=["LATITUDE", "LONGITUDE"])
-    
-    
-    def get(self, label):
-        return self.dataframes.get(label)
+
+    def locateStates(self, coor, shapefile_path):
+        usa = gpd.read_file(shapefile_path)
+        usa = usa[~usa['STUSPS'].isin(['AK', 'HI', 'PR'])]
+        sites = coor.reset_index()[["SITE_ID", "LATITUDE", "LONGITUDE"]]
+        sites["SITE_ID"] = sites["SITE_ID"].astype(str)
+        gdf = gpd.GeoDataFrame(sites, geometry=gpd.points_from_xy(sites["LONGITUDE"], sites["LATITUDE"]),
+                               crs="EPSG:4326")
+        joined = gpd.sjoin(gdf, usa[['STUSPS', 'geometry']], how="left", predicate='within')
+        return (joined.drop_duplicates(subset="SITE_ID")[["SITE_ID", "STUSPS"]]
+                .rename(columns={"STUSPS": "STATE"}).reset_index(drop=True))
+
+    def getStates(self, shapefile_path=ShapePaths["USStates"], coor=None):
+        # SITE_ID -> STATE, one spatial join per site instead of per row; cached until a source changes.
+        # coor is the getCoordinates() frame when the caller already has it
+        if shapefile_path in self.states:
+            return self.states[shapefile_path]
+        table = None
+        if self.cache is not None:
+            stat = os.stat(shapefile_path)
+            key = {"sources": [self.cache.sourceKey(path) for paths in DatasetPaths.values() for path in paths],
+                   "shapefile": [os.path.abspath(shapefile_path), stat.st_size, stat.st_mtime_ns]}
+            table = self.cache.loadTable("site_states", key)
+        if table is None:
+            table = self.locateStates(self.getCoordinates() if coor is None else coor, shapefile_path)
+            if self.cache is not None:
+                self.cache.storeTable("site_states", table, key)
+            print(f"🗺️ Located {len(table):,} sites in states")
+        states = table.set_index("SITE_ID")["STATE"]
+        if self.compact:
+            # The lookup covers every label's sites, so its states are the shared STATE dictionary
+            self.categories["STATE"] = pd.CategoricalDtype(sorted(states.dropna().unique()))
+            states = states.astype(self.categories["STATE"])
+        self.states[shapefile_path] = states
+        return states
+
+    def stateOf(self, sites, shapefile_path=ShapePaths["USStates"], coor=None):
+        # Maps a SITE_ID column to STATE; categorical columns are looked up once per site, then expanded by code
+        states = self.getStates(shapefile_path, coor)
+        if isinstance(sites.dtype, pd.CategoricalDtype):
+            lookup = pd.Series(sites.cat.categories.astype(str)).map(states).to_numpy(dtype=object)
+            # Code -1 (missing SITE_ID) lands on the trailing NaN
+            values = pd.Series(np.append(lookup, np.nan)[sites.cat.codes.to_numpy()], index=sites.index)
+        else:
+            values = sites.astype(str).map(states)
+        if "STATE" in self.categories:
+            return values.astype(self.categories["STATE"])
+        return values
+
+    def get(self, label, columns=None, filters=None):
+        # filters: {col: scalar | list | range | slice}, range/slice are half-open bounds
+        if label not in self.labels:
+            return None
+        if columns is None and not filters:
+            if label not in self.dataframes:
+                self.dataframes[label] = self.query(label)
+            return self.dataframes[label]
+        return self.query(label, columns, filters)
 
     def get_labels(self):
-        return list(self.dataframes.keys())
+        return list(self.labels)
     
    
 
@@ -1,70 +1,127 @@
 import pandas as pd
-from collections import defaultdict
-from haversine import haversine
+import numpy as np
+from scipy.sparse import coo_matrix, csr_matrix
+from scipy.sparse.csgraph import connected_components
 import os
-import networkx as nx
 
 class MissingPatternAnalyzer_100km:
+    EARTH_RADIUS_KM = 6371.0088  # mean radius, same as haversine's default
+    BASE_DIS = 100
+
     def __init__(self, check, coor):
         self.check = check
         self.coord_dict = self.buildCoor(coor)
+        self.sites = list(self.coord_dict)
+        self.distances = self.buildDistances()
+        self.adjacency = {}
+        self.allClusters = {}
+        self.sweepClusters = {}
         
     def buildCoor(self, coor):
         return {
             site: (row["LATITUDE"], row["LONGITUDE"])
             for site, row in coor.iterrows()
         }
-    
-    def find_spatial_clusters(self, sites, dis=100):
-        G = nx.Graph()
-        G.add_nodes_from(sites)
 
-        for i, site_a in enumerate(sites):
-            lat_a, lon_a = self.coord_dict.get(site_a, (None, None))
-            if lat_a is None: continue
+    def buildDistances(self):
+        coords = np.radians(np.array(list(self.coord_dict.values()), dtype=float).reshape(-1, 2))
+        lat, lon = coords[:, 0], coords[:, 1]
+        dlat = lat[:, None] - lat[None, :]
+        dlon = lon[:, None] - lon[None, :]
+        a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+        return 2 * self.EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
 
-            for site_b in sites[i + 1:]:
-                lat_b, lon_b = self.coord_dict.get(site_b, (None, None))
-                if lat_b is None: continue
+    def buildAdjacency(self, dis=100):
+        if dis not in self.adjacency:
+            # NaN coordinates compare False, so sites without a location get no neighbors
+            close = self.distances <= dis
+            np.fill_diagonal(close, False)
+            self.adjacency[dis] = csr_matrix(close)
+        return self.adjacency[dis]
 
-                if haversine((lat_a, lon_a), (lat_b, lon_b)) <= dis:
-                    G.add_edge(site_a, site_b)
-        return [sorted(list(comp)) for comp in nx.connected_components(G) if len(comp) > 1]
-    
-    def analyze100km(self, dis=100):
-        self.allClusters = {}
+    def clusterAllDates(self, missing, dis=100):
+        site_names = missing["SITE_ID"].astype(str).to_numpy()
+        date_code, dates = pd.factorize(missing["WEEK"].dt.normalize(), sort=True)
+        site_rank = pd.factorize(site_names, sort=True)[0]
+        coord_idx = pd.Index(self.sites).astype(str).get_indexer(site_names)
+
+        # Nodes are the missing (date, site) pairs, ordered so components come out sorted
+        order = np.lexsort((site_rank, date_code))
+        site_names, date_code, coord_idx = site_names[order], date_code[order], coord_idx[order]
+        n_nodes = len(order)
+
+        node_of = np.full((len(dates), len(self.sites)), -1, dtype=np.int64)
+        located = coord_idx >= 0
+        node_of[date_code[located], coord_idx[located]] = np.flatnonzero(located)
 
-        for label, df in self.check.TimeResults.items():
+        # Expand each located node into (node, neighbor site) pairs straight from the CSR adjacency
+        adjacency = self.buildAdjacency(dis)
+        src = np.flatnonzero(located)
+        degree = np.diff(adjacency.indptr)[coord_idx[src]]
+        first = adjacency.indptr[coord_idx[src]]
+        ends = np.cumsum(degree)
+        pos = np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - degree, degree)
+        neighbor_site = adjacency.indices[np.repeat(first, degree) + pos]
+        src = np.repeat(src, degree)
+        dst = node_of[date_code[src], neighbor_site]
+        linked = dst >= 0
+
+        graph = coo_matrix((np.ones(linked.sum(), dtype=np.int8), (src[linked], dst[linked])),
+                           shape=(n_nodes, n_nodes))
+        _, component = connected_components(graph, directed=False)
+        keep = np.bincount(component)[component] > 1
+
+        nodes = pd.DataFrame({
+            "DATE": dates[date_code[keep]].date,
+            "COMPONENT": component[keep],
+            "SITES": site_names[keep],
+        })
+        return (nodes.groupby("COMPONENT", sort=False)
+                .agg(DATE=("DATE", "first"), SITES=("SITES", ", ".join))
+                .reset_index(drop=True))
+    
+    def analyze100km(self, dis=100, labels=None):
+        for label, missing in self.check.MissingWeeks.items():
+            if labels is not None and label not in labels:
+                continue
             print(f"🔍 Processing label: {label}")
-            date_site_map = defaultdict(set)
-            all_clusters = []
-
-            for _, row in df.iterrows():
-                site = row["SITE_ID"]
-                if row["MISSING_DATES"] == "None":
-                    continue
-                for date in row["MISSING_DATES"].split(", "):
-                    date_site_map[date].add(site)
-
-
-            for date, sites in date_site_map.items():
-                clusters = self.find_spatial_clusters(list(sites), dis)
-                for cluster in clusters:
-                    all_clusters.append({
-                        "DATE": pd.to_datetime(date).date(),
-                        "SITES": ", ".join(cluster)
-                    })
-            result = (
-                pd.DataFrame(all_clusters)
-                .drop_duplicates(subset=["DATE", "SITES"])
-                .sort_values(["DATE", "SITES"])
-            )
+            result = self.clusterAllDates(missing, dis)
             self.allClusters[label]=result
             print(f"Processed SampleLoss_100km Successfully: {label} ✅")
             print(result)
 
+    def updateSince(self, label, since, dis=100):
+        # Only dates from `since` on can change when weeks are appended; earlier rows are kept
+        since = pd.Timestamp(since).normalize()
+        missing = self.check.MissingWeeks[label]
+        recent = self.clusterAllDates(missing[missing["WEEK"].dt.normalize() >= since], dis)
+        old = self.allClusters.get(label)
+        if old is not None:
+            recent = pd.concat([old[pd.to_datetime(old["DATE"]) < since], recent], ignore_index=True)
+        self.allClusters[label] = recent
+        print(f"Updated SampleLoss_100km from {since.date()}: {label} ✅")
+
+    def sweep(self, radii=(50, 100, 200)):
+        # Every radius reuses the distance matrix built in __init__
+        for dis in radii:
+            self.sweepClusters[dis] = {}
+            for label, missing in self.check.MissingWeeks.items():
+                result = self.clusterAllDates(missing, dis)
+                self.sweepClusters[dis][label] = result
+                print(f"📏 {label} @ {dis} km: {len(result):,} clusters")
+
+    def baseClusters(self):
+        # ButterflyChart reads the plain <label> sheets, so a sweep-only run still gets them at the base radius
+        clusters = dict(self.allClusters)
+        for label, missing in self.check.MissingWeeks.items():
+            if label not in clusters:
+                clusters[label] = self.sweepClusters.get(self.BASE_DIS, {}).get(label)
+                if clusters[label] is None:
+                    clusters[label] = self.clusterAllDates(missing, self.BASE_DIS)
+        return clusters
+
     def export(self, filename="SampleLossStatistics-Range-100km-cluster_result.xlsx"):
-        if not self.allClusters:
+        if not self.allClusters and not self.sweepClusters:
             print("⚠️ No data for export")
             return
        
@@ -74,7 +131,10 @@ class MissingPatternAnalyzer_100km:
         export_path = os.path.join(export_dir, filename)
 
         with pd.ExcelWriter(export_path, engine="openpyxl") as writer:
-            for label, df in self.allClusters.items():
+            for label, df in self.baseClusters().items():
                 df.to_excel(writer, sheet_name=label[:31], index=False)
+            for dis, clusters in self.sweepClusters.items():
+                for label, df in clusters.items():
+                    df.to_excel(writer, sheet_name=f"{label}_{dis}km"[:31], index=False)
         print(f"\n✅ Export successfully: {export_path}")
 
@@ -1,5 +1,5 @@
 import pandas as pd
-from collections import defaultdict
+import numpy as np
 import os
 
 class MissingPatternAnalyzerAll:
@@ -7,36 +7,40 @@ class MissingPatternAnalyzerAll:
         self.check = check  
         self.coor = coor
         self.cluster = {}
+        self.coMissing = {}
 
     def analyzeCause(self):
 
-        for label, df in self.check.TimeResults.items():
+        for label, missing in self.check.MissingWeeks.items():
             print(f"\n🔍 Analyzing missing data: {label}")
-            date_site_map = defaultdict(set)  
-
-            for _, row in df.iterrows():
-                site = row["SITE_ID"]
-                if row["MISSING_DATES"] == "None":
-                    continue
-                for date_str in row["MISSING_DATES"].split(", "):
-                    date_site_map[date_str].add(site)
-
-            rows = []
-            for date, sites in date_site_map.items():
-                if len(sites) > 1:
-                    site_list = sorted(sites)
-                    rows.append({
-                        "DATE": date,
-                        "SITE_IDS": ", ".join(site_list)
-                    })
-
-            result_df = pd.DataFrame(rows)
-            result_df["DATE"] = pd.to_datetime(result_df["DATE"]).dt.date
-            result_df["SITE_COUNT"] = result_df["SITE_IDS"].apply(lambda x: len(x.split(", ")))
-            result_df = result_df[["DATE", "SITE_COUNT", "SITE_IDS"]].sort_values("DATE")
+            date_code, dates = pd.factorize(missing["WEEK"].dt.normalize(), sort=True)
+            site_code = missing["SITE_ID"].cat.codes.to_numpy()
+            site_rank = np.argsort(np.argsort(missing["SITE_ID"].cat.categories.astype(str)))
+
+            site_count = np.bincount(date_code, minlength=len(dates))
+            shared = site_count > 1
+
+            # Long-form (DATE, SITE_ID) rows of dates missed by 2+ sites, kept for export
+            rows = np.flatnonzero(shared[date_code])
+            rows = rows[np.lexsort((site_rank[site_code[rows]], date_code[rows]))]
+            self.coMissing[label] = pd.DataFrame({
+                "DATE": dates[date_code[rows]].date,
+                "SITE_ID": missing["SITE_ID"].to_numpy()[rows],
+            })
+
+            result_df = pd.DataFrame({
+                "DATE": dates[shared].date,
+                "SITE_COUNT": site_count[shared],
+            })
             self.cluster[label] = result_df
             print(f"Processed SampleLoss Successfully: {label} ✅")
 
+    def withSiteIds(self, label):
+        site_ids = (self.coMissing[label].assign(SITE_ID=lambda df: df["SITE_ID"].astype(str))
+                    .groupby("DATE", sort=False)["SITE_ID"].agg(", ".join))
+        df = self.cluster[label].copy()
+        df["SITE_IDS"] = df["DATE"].map(site_ids)
+        return df
 
     def export(self, filename="SampleLossStatistics-Range-All_result.xlsx"):
         if not self.cluster:
@@ -49,7 +53,7 @@ class MissingPatternAnalyzerAll:
         export_path = os.path.join(export_dir, filename)
 
         with pd.ExcelWriter(export_path, engine="openpyxl") as writer:
-            for label, df in self.cluster.items():
-                df.to_excel(writer, sheet_name=label[:31], index=False)
+            for label in self.cluster:
+                self.withSiteIds(label).to_excel(writer, sheet_name=label[:31], index=False)
         print(f"\n✅ Export successfully: {export_path}")
 
@@ -0,0 +1,64 @@
+import os
+import gzip
+import mimetypes
+import flask
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Preferred first; brotli variants are only written when the optional Brotli package
+# (listed in requirements.txt) is installed, otherwise clients get gzip
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+def precompress(path):
+    # Written next to the HTML at generation time so the server never compresses per request
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path + ".gz", "wb") as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + ".br", "wb") as f:
+            f.write(brotli.compress(data))
+
+def accepted(header):
+    encodings = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            encodings[name.lower()] = q
+    return {name for name, q in encodings.items() if q > 0}
+
+def sendAsset(folder, filename, max_age=300):
+    # Precompressed siblings are only served through negotiation on their source path; fetched directly
+    # they would go out with the source's mimetype and no Content-Encoding
+    if filename.endswith(tuple(ext for _, ext in ENCODINGS)):
+        flask.abort(404)
+    source = safe_join(folder, filename)
+    variant, encoding = filename, None
+    if source is not None and os.path.isfile(source):
+        wanted = accepted(flask.request.headers.get("Accept-Encoding", ""))
+        for name, ext in ENCODINGS:
+            packed = source + ext
+            # A variant older than its source is stale (the HTML was rewritten without it)
+            if name in wanted and os.path.isfile(packed) and os.path.getmtime(packed) >= os.path.getmtime(source):
+                variant, encoding = filename + ext, name
+                break
+
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    # conditional=True answers If-None-Match with 304 using the ETag of the file actually sent
+    response = flask.send_from_directory(folder, variant, mimetype=mimetype, conditional=True,
+                                         etag=True, max_age=max_age)
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = f"public, max-age={max_age}, must-revalidate"
+    return response
@@ -0,0 +1,61 @@
+import pandas as pd
+
+class StreamAggregator:
+    MERGE = {"sum": "sum", "count": "sum", "min": "min", "max": "max"}
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.partials = {}
+
+    def chunks(self, label, columns):
+        if self.loader.streaming:
+            yield from self.loader.iterChunks(label, columns=columns)
+        else:
+            yield self.loader.get(label, columns=columns)
+
+    def merge(self, total, part, keys, dropna=True):
+        if total is None:
+            return part
+        # Re-reduce after every chunk so memory tracks the number of groups, not rows
+        merged = pd.concat([total, part]).groupby(level=keys, observed=True, dropna=dropna)
+        if isinstance(part, pd.Series):
+            return merged.sum()
+        return merged.agg({col: self.MERGE[col] for col in part.columns})
+
+    def count(self, label, key):
+        total = None
+        for chunk in self.loader.iterChunks(label, columns=[key]):
+            total = self.merge(total, chunk.groupby(key, observed=True).size(), [key])
+        if total is None:
+            return pd.Series(dtype="int64", name=key)
+        return total.sort_index().astype("int64")
+
+    def sumCount(self, label, keys, value="CONC", derive=None, columns=None,
+                 stats=("sum", "count"), dropna=True):
+        memo_key = (label, tuple(keys), value, tuple(stats), dropna)
+        if derive is None and memo_key in self.partials:
+            return self.partials[memo_key]
+
+        columns = columns or list(keys) + [value]
+        total = None
+        for chunk in self.chunks(label, columns):
+            if derive is not None:
+                chunk = derive(chunk)
+            chunk = chunk.assign(**{value: pd.to_numeric(chunk[value], errors="coerce")})
+            part = chunk.groupby(keys, observed=True, dropna=dropna)[value].agg(list(stats))
+            total = self.merge(total, part, keys, dropna)
+
+        if total is None:
+            total = pd.DataFrame(columns=list(stats))
+        if derive is None:
+            self.partials[memo_key] = total
+        return total
+
+    def rollup(self, partial, keys, value="CONC"):
+        grouped = partial.groupby(level=keys, observed=True)[["sum", "count"]].sum()
+        # Groups with no valid value get NaN, as DataFrame.groupby().mean() does
+        grouped[value] = grouped["sum"] / grouped["count"].where(grouped["count"] > 0)
+        return grouped[[value]].reset_index()
+
+    def mean(self, label, keys, value="CONC", derive=None, columns=None):
+        return self.rollup(self.sumCount(label, keys, value, derive, columns), keys, value)
@@ -1,49 +1,62 @@
 import pandas as pd
 from ReadDatacsv import DataLoader
+from GapDetector import GapDetector
 import os
 
 class TimeCheck:
     def __init__(self, loader):
         self.loader = loader
+        self.detector = GapDetector()
         self.TimeResults = {}
+        self.MissingWeeks = {}
 
-    def analyze(self):
-        for label in self.loader.get_labels():
-            df = self.loader.get(label)
+    def analyze(self, labels=None):
+        for label in labels or self.loader.get_labels():
+            df = self.loader.get(label, columns=["SITE_ID", "DATEON", "DATEOFF"])
 
             if not {"SITE_ID", "DATEON", "DATEOFF"}.issubset(df.columns):
                 print(f"⚠️ Ignore {label} because missing necessary column.")
                 continue
 
-            df["DATEON"] = pd.to_datetime(df["DATEON"], errors="coerce")
-            df["DATEOFF"] = pd.to_datetime(df["DATEOFF"], errors="coerce")
+            # MissingWeeks is the primary output: one (SITE_ID, WEEK) row per missing week
+            summary, missing = self.detector.detect(df)
+            self.MissingWeeks[label] = missing
+            self.TimeResults[label] = summary
+            print(f"📊 Processed TimeStatistics successfully: {label} ✅")
 
-            result = []
-            for site, group in df.groupby("SITE_ID"):
-                min_date = group["DATEON"].min()
-                max_date = group["DATEOFF"].max()
+    def updateSites(self, label, sites):
+        # Re-detects gaps for the given sites only; returns the earliest week whose status changed
+        sites = [str(site) for site in sites]
+        df = self.loader.get(label, columns=["SITE_ID", "DATEON", "DATEOFF"], filters={"SITE_ID": sites})
+        summary, missing = self.detector.detect(df)
 
-                if pd.isna(min_date) or pd.isna(max_date):
-                    continue
+        old_summary, old_missing = self.TimeResults[label], self.MissingWeeks[label]
+        touched = old_missing["SITE_ID"].astype(str).isin(sites)
+        before = set(zip(old_missing.loc[touched, "SITE_ID"].astype(str), old_missing.loc[touched, "WEEK"]))
+        after = set(zip(missing["SITE_ID"].astype(str), missing["WEEK"]))
+        changed = before ^ after
 
-                full_weeks = pd.date_range(start=min_date, end=max_date, freq="7D")
-                actual_weeks = group["DATEON"].dropna().sort_values().drop_duplicates()
-                missing = full_weeks.difference(actual_weeks)
+        keep = old_summary[~old_summary["SITE_ID"].astype(str).isin(sites)]
+        self.TimeResults[label] = (self.loader.concatFrames([keep, summary])
+                                   .sort_values("SITE_ID").reset_index(drop=True))
+        self.MissingWeeks[label] = (self.loader.concatFrames([old_missing[~touched], missing])
+                                    .sort_values(["SITE_ID", "WEEK"]).reset_index(drop=True))
+        return min(week for _, week in changed) if changed else None
 
-                result.append({
-                    "SITE_ID": site,
-                    "START_DATE": min_date.date(),
-                    "END_DATE": max_date.date(),
-                    "MISSING_COUNT": len(missing),
-                    "MISSING_DATES": ", ".join([d.strftime("%Y-%m-%d") for d in missing]) if not missing.empty else "None"
-                })
+    def missingMatrix(self, label):
+        missing = self.MissingWeeks[label]
+        matrix = pd.crosstab(missing["SITE_ID"], missing["WEEK"].dt.normalize()).astype(bool)
+        return matrix.reindex(self.TimeResults[label]["SITE_ID"], fill_value=False)
 
-            self.TimeResults[label] = pd.DataFrame(result)
-            time_df = self.TimeResults[label]
-            print(f"📊 Processed TimeStatistics successfully: {label} ✅")
-          
+    def withMissingDates(self, label):
+        missing = self.MissingWeeks[label]
+        dates = (missing.assign(WEEK=missing["WEEK"].dt.strftime("%Y-%m-%d"))
+                 .groupby("SITE_ID", observed=True)["WEEK"].agg(", ".join))
+        df = self.TimeResults[label].copy()
+        df["MISSING_DATES"] = df["SITE_ID"].map(dates).fillna("None")
+        return df
 
-    def export(self, filename="TimeStatistics_result.xlsx"):
+    def export(self, filename="TimeStatistics_result.xlsx", include_dates=True):
         if not self.TimeResults:
             print("⚠️ No data for export")
             return
@@ -55,6 +68,8 @@ class TimeCheck:
 
         with pd.ExcelWriter(export_path, engine="openpyxl") as writer:
             for label, df in self.TimeResults.items():
+                if include_dates:
+                    df = self.withMissingDates(label)
                 df.to_excel(writer, sheet_name=label[:31], index=False)
         print(f"\n✅ Export successfully: {export_path}")
 